@@ -1,17 +1,259 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-import json
+from typing import Dict, Any, Optional, List, FrozenSet, Callable, Awaitable, Tuple
+from collections import Counter
+from contextlib import aclosing
+from functools import lru_cache
 import asyncio
 import logging
-from .providers import AIProvider, AIProviderFactory
+import re
+import orjson
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from .providers import AIProvider, AIProviderFactory, RetryableProviderError
+from .cache import inflight_requests, response_cache
+from .parsing import JsonObjectScanner, find_json_object
+from .rate_limit import estimate_tokens
 from ..models.debate import Persona, AgentMessage
-from datetime import datetime
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Prompt templates, rendered with str.format_map
+_PERSONA_PREFIX_TEMPLATE = """あなたは「{name}」として議論に参加しています。
+
+キャラクター設定:
+- 名前: {name}
+- 性格: {persona}
+- 話し方: {speech_style}
+- 重視する要素: {weights_json}
+
+"""
+
+# Per-debate context appended to the persona block in the system prompt
+_DEBATE_CONTEXT_TEMPLATE = """議題: {topic}
+選択肢: {options_str}"""
+
+_OPINION_PROMPT_TEMPLATE = """{search_block}以下のJSON形式で回答してください:
+{{
+    "message": "あなたの意見や理由を100文字程度で述べてください。キャラクターの性格と話し方を反映させてください。",
+    "choice": "選択肢の中から1つを選んでください"
+}}
+
+キャラクターになりきって、自然で個性的な回答をしてください。"""
+
+_QUESTION_PROMPT_TEMPLATE = """他の参加者の意見:
+{other_opinions}
+
+他の参加者の意見を聞いて、あなたのキャラクターとして疑問に思った点や詳しく聞きたい点について質問してください。
+
+質問可能な参加者: {available_agents_str}
+
+以下のJSON形式で回答してください:
+{{
+    "question": "質問内容を80文字程度で。キャラクターの話し方で自然に。",
+    "target_agent": "質問したい相手のagent_id (上記のIDから必ず選択)"
+}}
+
+建設的で興味深い質問をしてください。"""
+
+_RESPONSE_PROMPT_TEMPLATE = """{asker_name}からの質問:
+「{question}」
+
+この質問にあなたのキャラクターとして答えてください。
+
+以下のJSON形式で回答してください:
+{{
+    "answer": "質問への回答を100文字程度で。キャラクターの話し方で自然に。",
+    "choice": "現時点での選択肢（変更があれば更新）"
+}}
+
+誠実かつキャラクターらしい回答をしてください。"""
+
+_FINAL_OPINION_PROMPT_TEMPLATE = """これまでの議論:
+{discussion_summary}
+
+全ての議論を聞いた上で、あなたの最終的な意見を述べてください。
+他の人の意見で考えが変わった部分があれば言及してください。
+
+以下のJSON形式で回答してください:
+{{
+    "message": "最終意見を120文字程度で。他の人の意見への反応も含めて。",
+    "choice": "最終的な選択肢"
+}}
+
+熟慮した最終判断を示してください。"""
+
+_DECISION_PROMPT_TEMPLATE = """議論の内容を総合的に判断し、最終決定を行ってください。
+
+議題: {topic}
+選択肢: {options_str}
+
+議論の内容:
+{debate_summary}
+
+各参加者の意見を公平に検討し、以下のJSON形式で最終決定を行ってください:
+
+{{
+    "final_choice": "選択肢の中から1つを選択",
+    "summary": "決定理由を150文字程度で説明してください。各参加者の意見をどう考慮したかを含めてください。",
+    "confidence": 0.8
+}}
+
+confidence は 0.0 から 1.0 の間で、この決定への確信度を示してください。
+全体的なバランスを考慮した、公正で合理的な判断をしてください。"""
+
+_OFFICER_QUESTION_PROMPT_TEMPLATE = """あなたは議論の議長として、最終決定を下すために必要な情報を収集しています。
+
+議題: {topic}
+選択肢: {options_str}
+
+{agent_name}の発言:
+「{message}」
+選択: {choice}
+
+この発言について、最終決定のためにより詳しく知りたい点や明確にしたい点があれば質問してください。
+
+以下のJSON形式で回答してください:
+{{
+    "question": "議長として聞きたい質問を80文字程度で。丁寧で公正な口調で。"
+}}
+
+建設的で公平な質問をしてください。不要な場合は空文字を返してください。"""
+
+# One participant in a combined initial-opinion request
+_BATCH_PERSONA_TEMPLATE = """- ID: {agent_id}
+  名前: {name}
+  性格: {persona}
+  話し方: {speech_style}
+  重視する要素: {weights_json}
+"""
+
+_BATCH_OPINION_PROMPT_TEMPLATE = """議題: {topic}
+選択肢: {options_str}
+
+{search_block}以下の参加者それぞれになりきって、議論の初期意見を述べてください。
+
+参加者:
+{personas_block}
+以下のJSON形式で、全ての参加者について1件ずつ回答してください:
+{{
+    "opinions": [
+        {{
+            "agent_id": "参加者のID",
+            "message": "その参加者の意見や理由を100文字程度で述べてください。キャラクターの性格と話し方を反映させてください。",
+            "choice": "選択肢の中から1つを選んでください"
+        }}
+    ]
+}}
+
+それぞれのキャラクターになりきって、自然で個性的な回答をしてください。"""
+
+# Responses larger than this are parsed in a worker thread
+_OFFLOAD_PARSE_BYTES = 8 * 1024
+
+# Appended when a response could not be parsed and the request is re-issued
+_JSON_REMINDER = "\n\n必ず有効なJSONオブジェクトのみを出力してください。"
+
+# Opinion returned when an agent could not generate one; callers that reuse
+# opinions (e.g. the CLI cache) check for it so an outage is never replayed
+FALLBACK_OPINION_MESSAGE = "申し訳ありません、技術的な問題で意見を述べることができません。"
+
+# Single-pass extractor for the officer decision object; confidence must be a
+# whole JSON number ending the member, or the full parse takes over
+_DECISION_RE = re.compile(
+    r'"final_choice"\s*:\s*"([^"\\]*)"\s*,\s*'
+    r'"summary"\s*:\s*"((?:[^"\\]|\\.)*)"\s*,\s*'
+    r'"confidence"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)(?=\s*[,}])'
+)
+
+@lru_cache(maxsize=64)
+def _join_options(options: Tuple[str, ...]) -> str:
+    """Options as listed in prompts, built once per debate and shared by all agents"""
+    return "、".join(options)
+
+@lru_cache(maxsize=64)
+def _debate_context(topic: str, options: Tuple[str, ...]) -> str:
+    """Topic and options block of the system prompt, shared by all agents"""
+    return _DEBATE_CONTEXT_TEMPLATE.format_map({
+        "topic": topic,
+        "options_str": _join_options(options)
+    })
+
+def _retry_wait(base_delay: float, max_delay: float):
+    """Honour Retry-After when the provider sends it, else jittered exponential backoff"""
+    backoff = wait_exponential_jitter(initial=base_delay, max=max_delay, jitter=base_delay)
+    
+    def wait(retry_state: RetryCallState) -> float:
+        retry_after = getattr(retry_state.outcome.exception(), 'retry_after', None)
+        if retry_after is not None:
+            return min(max_delay, retry_after)
+        return backoff(retry_state)
+    
+    return wait
+
+def _json_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a strict JSON schema for structured provider output"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+def _choice_schema(options: List[str]) -> Dict[str, Any]:
+    """Schema for a value that must be one of the debate options"""
+    return {"type": "string", "enum": list(options)}
+
+async def _notify_result(
+    on_result: Optional[Callable[["BaseAgent", Any], Awaitable[None]]],
+    agent: "BaseAgent",
+    result: Any
+):
+    """Hand a result to on_result; a failing callback never replaces the result"""
+    if on_result is None:
+        return
+    try:
+        await on_result(agent, result)
+    except Exception as e:
+        logger.error(f"Result callback failed for agent {agent.agent_id}: {str(e)}")
+
+async def run_round(
+    agents: List["BaseAgent"],
+    method_name: str,
+    *args: Any,
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[["BaseAgent", Any], Awaitable[None]]] = None
+) -> List[Any]:
+    """Call the same agent method on every agent concurrently
+    
+    Results are returned in agent order; failures, including calls that
+    exceed the per-call timeout, are returned as exceptions. on_result is
+    awaited with each agent's result as soon as that agent finishes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(agent: "BaseAgent") -> Any:
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(getattr(agent, method_name)(*args), timeout)
+            except Exception as e:
+                result = e
+        
+        await _notify_result(on_result, agent, result)
+        return result
+    
+    return await asyncio.gather(
+        *(run(agent) for agent in agents),
+        return_exceptions=True
+    )
+
 class BaseAgent(ABC):
     """Base class for all AI agents"""
     
+    # Retry backoff bounds in seconds
+    retry_base_delay: float = 0.25
+    retry_max_delay: float = 8.0
+    
     def __init__(
         self, 
         agent_id: str,
@@ -25,6 +267,10 @@ class BaseAgent(ABC):
         self.max_retries = max_retries
         self.search_context = None  # Web search results context
     
+    def _format_options(self, options: List[str]) -> str:
+        """Join options for prompts; the string is shared by every agent in the debate"""
+        return _join_options(tuple(options))
+    
     @abstractmethod
     async def generate_response(
         self, 
@@ -45,56 +291,184 @@ class BaseAgent(ABC):
         """Build the prompt for the AI model"""
         pass
     
+    def _cache_key(self, prompt: str, max_tokens: int, **kwargs) -> str:
+        """Cache key for a provider request
+        
+        stream only changes how the response is delivered, so it is left out
+        and every caller builds the same key for the same request.
+        """
+        kwargs.pop('stream', None)
+        return response_cache.make_key(
+            type(self.provider).__name__,
+            prompt,
+            max_tokens,
+            sorted(kwargs.items())
+        )
+    
+    async def _generate_json(
+        self, 
+        prompt: str, 
+        max_tokens: int = 128,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Generate and parse a JSON response, re-asking once if it is malformed"""
+        kwargs.setdefault('json_mode', True)
+        response = await self._generate_with_retry(prompt=prompt, max_tokens=max_tokens, **kwargs)
+        
+        try:
+            return await self._parse_json_response_async(response)
+        except ValueError:
+            # Retrying the same request would fail the same way; ask more firmly instead
+            logger.warning(f"Invalid JSON from agent {self.agent_id}, requesting again")
+            response_cache.discard(self._cache_key(prompt, max_tokens, **kwargs))
+        
+        response = await self._generate_with_retry(
+            prompt=prompt + _JSON_REMINDER,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        return await self._parse_json_response_async(response)
+    
     async def _generate_with_retry(
         self, 
         prompt: str, 
         max_tokens: int = 128,
+        stream: bool = False,
         **kwargs
     ) -> str:
-        """Generate response with retry logic"""
-        last_error = None
+        """Generate response with retry logic
         
-        for attempt in range(self.max_retries):
-            try:
-                response = await self.provider.generate_response(
-                    prompt=prompt,
-                    max_tokens=max_tokens,
-                    **kwargs
-                )
-                
-                if response and response.strip():
-                    return response
-                else:
-                    raise ValueError("Empty response from AI provider")
+        With stream=True the response is streamed and cut off as soon as a
+        complete JSON object has been received.
+        """
+        # Identical requests (including temperature) are served from cache
+        cache_key = self._cache_key(prompt, max_tokens, **kwargs)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cache hit for agent {self.agent_id}")
+            return cached
+        
+        # Concurrent identical requests share a single provider call, which
+        # caches its own response so it is kept even if every caller timed out
+        async def request() -> str:
+            response = await self._request_with_retry(prompt, max_tokens, stream, **kwargs)
+            response_cache.set(cache_key, response)
+            return response
+        
+        return await inflight_requests.run(cache_key, request)
+    
+    async def _request_with_retry(
+        self, 
+        prompt: str, 
+        max_tokens: int,
+        stream: bool,
+        **kwargs
+    ) -> str:
+        """Call the provider, retrying transient failures with backoff"""
+        estimated_tokens = (
+            estimate_tokens(prompt)
+            + estimate_tokens(kwargs.get('system_prompt') or "")
+            + max_tokens
+        )
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_retries),
+            wait=_retry_wait(self.retry_base_delay, self.retry_max_delay),
+            retry=retry_if_exception_type(RetryableProviderError),
+            before_sleep=self._log_retry,
+            reraise=True
+        )
+        
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    # Every attempt counts against the provider's RPM/TPM budget
+                    if self.provider.rate_limiter:
+                        await self.provider.rate_limiter.acquire(estimated_tokens)
                     
-            except Exception as e:
-                last_error = e
-                logger.warning(
-                    f"Attempt {attempt + 1} failed for agent {self.agent_id}: {str(e)}"
-                )
-                
-                if attempt < self.max_retries - 1:
-                    # Exponential backoff
-                    await asyncio.sleep(2 ** attempt)
+                    if stream:
+                        response = await self._stream_json_response(
+                            prompt=prompt,
+                            max_tokens=max_tokens,
+                            **kwargs
+                        )
+                    else:
+                        response = await self.provider.generate_response(
+                            prompt=prompt,
+                            max_tokens=max_tokens,
+                            **kwargs
+                        )
+                    
+                    if not response or not response.strip():
+                        raise ValueError("Empty response from AI provider")
+                    return response
+        
+        except Exception as e:
+            if isinstance(e, RetryableProviderError):
+                logger.error(f"All retry attempts failed for agent {self.agent_id}")
+            else:
+                logger.warning(f"Non-retriable error for agent {self.agent_id}: {str(e)}")
+            raise
+    
+    def _log_retry(self, retry_state: RetryCallState):
+        """Log a failed attempt before backing off"""
+        logger.warning(
+            f"Attempt {retry_state.attempt_number} failed for agent {self.agent_id}: "
+            f"{str(retry_state.outcome.exception())}"
+        )
+    
+    async def _stream_json_response(
+        self, 
+        prompt: str, 
+        max_tokens: int = 128,
+        **kwargs
+    ) -> str:
+        """Stream a response and stop once a complete JSON object arrives"""
+        scanner = JsonObjectScanner()
+        chunks = []
         
-        logger.error(f"All retry attempts failed for agent {self.agent_id}")
-        raise last_error
+        async with aclosing(self.provider.stream_response(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            **kwargs
+        )) as chunk_stream:
+            async for chunk in chunk_stream:
+                chunks.append(chunk)
+                if scanner.feed(chunk):
+                    break
+        
+        response = "".join(chunks)
+        if scanner.complete:
+            return response[scanner.start:scanner.end]
+        return response.strip()
+    
+    async def _parse_json_response_async(self, response: str) -> Dict[str, Any]:
+        """Parse a JSON response without blocking the event loop on large payloads"""
+        if len(response) > _OFFLOAD_PARSE_BYTES:
+            return await asyncio.to_thread(self._parse_json_response, response)
+        return self._parse_json_response(response)
     
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON response with error handling"""
+        # Structured output is usually the bare JSON object
+        stripped = response.strip()
+        if stripped.startswith('{') and stripped.endswith('}'):
+            try:
+                return orjson.loads(stripped)
+            except orjson.JSONDecodeError:
+                pass
+        
         try:
             # Try to extract JSON from response if it's wrapped in text
-            start = response.find('{')
-            end = response.rfind('}') + 1
+            span = find_json_object(response)
             
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                return json.loads(json_str)
+            if span:
+                start, end = span
+                return orjson.loads(response[start:end])
             else:
                 # Fallback: try to parse the entire response
-                return json.loads(response)
+                return orjson.loads(response)
                 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON response: {response}")
             raise ValueError(f"Invalid JSON response: {str(e)}")
     
@@ -111,7 +485,6 @@ class BaseAgent(ABC):
             agent_id=self.agent_id,
             agent_name=self.agent_name,
             message=message,
-            timestamp=datetime.utcnow(),
             choice=choice,
             message_type=message_type,
             target_agent=target_agent,
@@ -134,6 +507,128 @@ class DebateAgent(BaseAgent):
             max_retries=max_retries
         )
         self.persona = persona
+        self._weights_json = orjson.dumps(persona.weights, option=orjson.OPT_SORT_KEYS).decode()
+        
+        # Stable persona block; with the debate context it forms the cacheable system prompt
+        self._persona_prefix = _PERSONA_PREFIX_TEMPLATE.format_map({
+            "name": persona.name,
+            "persona": persona.persona,
+            "speech_style": persona.speech_style,
+            "weights_json": self._weights_json
+        })
+        self._system_key = None
+        self._system_prompt = ""
+    
+    @classmethod
+    async def generate_batch(
+        cls,
+        agents: List["DebateAgent"],
+        topic: str,
+        options: List[str],
+        context: Dict[str, Any] = None,
+        concurrency: int = 8,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[["BaseAgent", Any], Awaitable[None]]] = None
+    ) -> List[AgentMessage]:
+        """Generate initial opinions for several agents concurrently
+        
+        timeout bounds the whole round: the combined request and any
+        per-agent fallback share one deadline.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        results: List[Any] = [None] * len(agents)
+        if settings.batch_initial_opinions and cls._can_combine(agents):
+            combined = await cls._generate_combined(agents, topic, options, timeout)
+            results = [combined.get(agent.agent_id) for agent in agents]
+            for agent, result in zip(agents, results):
+                if result is not None:
+                    await _notify_result(on_result, agent, result)
+        
+        # Agents without a combined result make their own request, which
+        # keeps its own fallback handling inside generate_response
+        pending = [agent for agent, result in zip(agents, results) if result is None]
+        if pending:
+            individual = iter(await run_round(
+                pending, "generate_response", topic, options, context,
+                concurrency=concurrency,
+                timeout=max(0.0, deadline - loop.time()) if deadline is not None else None,
+                on_result=on_result
+            ))
+            results = [next(individual) if result is None else result for result in results]
+        
+        return results
+    
+    @staticmethod
+    def _can_combine(agents: List["DebateAgent"]) -> bool:
+        """Whether the agents can share one request, i.e. they use the same provider"""
+        return len(agents) > 1 and all(agent.provider is agents[0].provider for agent in agents)
+    
+    @classmethod
+    async def _generate_combined(
+        cls,
+        agents: List["DebateAgent"],
+        topic: str,
+        options: List[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, AgentMessage]:
+        """Generate every agent's initial opinion from a single provider request"""
+        lead = agents[0]
+        agents_by_id = {agent.agent_id: agent for agent in agents}
+        prompt = _BATCH_OPINION_PROMPT_TEMPLATE.format_map({
+            "topic": topic,
+            "options_str": lead._format_options(options),
+            "search_block": lead._build_search_block(),
+            "personas_block": "".join(agent._build_batch_persona_entry() for agent in agents)
+        })
+        
+        try:
+            parsed = await asyncio.wait_for(lead._generate_json(
+                prompt=prompt,
+                max_tokens=128 * len(agents),
+                temperature=0.7,
+                response_schema=_json_schema({
+                    "opinions": {
+                        "type": "array",
+                        "items": _json_schema({
+                            "agent_id": {"type": "string", "enum": list(agents_by_id)},
+                            "message": {"type": "string"},
+                            "choice": _choice_schema(options)
+                        })
+                    }
+                })
+            ), timeout)
+        except Exception as e:
+            # On timeout wait_for has already cancelled the shared provider call
+            logger.warning(f"Combined initial opinions failed, using per-agent requests: {str(e)}")
+            return {}
+        
+        messages = {}
+        opinions = parsed.get('opinions')
+        for opinion in opinions if isinstance(opinions, list) else []:
+            if not isinstance(opinion, dict):
+                continue
+            agent = agents_by_id.get(opinion.get('agent_id'))
+            if agent and opinion.get('message') and agent.agent_id not in messages:
+                messages[agent.agent_id] = agent._create_agent_message(
+                    opinion['message'],
+                    opinion.get('choice', ''),
+                    message_type="initial_opinion",
+                    round_number=1
+                )
+        
+        logger.info(f"Combined request produced {len(messages)}/{len(agents)} initial opinions")
+        return messages
+    
+    def _build_batch_persona_entry(self) -> str:
+        """Describe this agent's persona for a combined request"""
+        return _BATCH_PERSONA_TEMPLATE.format_map({
+            "agent_id": self.agent_id,
+            "name": self.persona.name,
+            "persona": self.persona.persona,
+            "speech_style": self.persona.speech_style,
+            "weights_json": self._weights_json
+        })
     
     async def generate_response(
         self, 
@@ -145,15 +640,18 @@ class DebateAgent(BaseAgent):
         try:
             prompt = self._build_prompt(topic, options, context)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=128,
-                temperature=0.7
+                stream=True,
+                system_prompt=self._build_system_prompt(topic, options),
+                temperature=0.7,
+                response_schema=_json_schema({
+                    "message": {"type": "string"},
+                    "choice": _choice_schema(options)
+                })
             )
             
-            # Parse the structured response
-            parsed = self._parse_json_response(response)
-            
             message = parsed.get('message', '')
             choice = parsed.get('choice', '')
             
@@ -173,12 +671,20 @@ class DebateAgent(BaseAgent):
             logger.error(f"Error generating response for {self.agent_id}: {str(e)}")
             # Fallback response
             return self._create_agent_message(
-                f"申し訳ありません、技術的な問題で意見を述べることができません。",
+                FALLBACK_OPINION_MESSAGE,
                 options[0] if options else None,
                 message_type="initial_opinion",
                 round_number=1
             )
     
+    def _build_system_prompt(self, topic: str, options: List[str]) -> str:
+        """Build the persona and debate context shared by every call in a debate"""
+        key = (topic, tuple(options))
+        if key != self._system_key:
+            self._system_prompt = self._persona_prefix + _debate_context(*key)
+            self._system_key = key
+        return self._system_prompt
+    
     def _build_prompt(
         self, 
         topic: str, 
@@ -186,47 +692,31 @@ class DebateAgent(BaseAgent):
         context: Dict[str, Any] = None
     ) -> str:
         """Build prompt for debate agent"""
-        options_str = "、".join(options)
-        
-        prompt = f"""あなたは「{self.persona.name}」として議論に参加してください。
-
-キャラクター設定:
-- 名前: {self.persona.name}
-- 性格: {self.persona.persona}
-- 話し方: {self.persona.speech_style}
-- 重視する要素: {json.dumps(self.persona.weights, ensure_ascii=False)}
-
-議題: {topic}
-選択肢: {options_str}"""
-
-        # Add web search context if available
+        return _OPINION_PROMPT_TEMPLATE.format_map({
+            "search_block": self._build_search_block()
+        })
+    
+    def _build_search_block(self) -> str:
+        """Format the web search context, if any, as a prompt section"""
+        parts = []
         if self.search_context:
-            prompt += "\n\n実際の店舗情報（Web検索結果）:\n"
+            parts.append("実際の店舗情報（Web検索結果）:\n")
             for store_name, store_data in self.search_context.items():
                 info = store_data.get('info', {})
-                prompt += f"\n【{store_name}】\n"
+                parts.append(f"\n【{store_name}】\n")
                 if info.get('description'):
-                    prompt += f"- 概要: {info['description']}\n"
+                    parts.append(f"- 概要: {info['description']}\n")
                 if info.get('location'):
-                    prompt += f"- 場所: {info['location']}\n"
+                    parts.append(f"- 場所: {info['location']}\n")
                 if info.get('hours'):
-                    prompt += f"- 営業時間: {info['hours']}\n"
+                    parts.append(f"- 営業時間: {info['hours']}\n")
                 if info.get('price_range'):
-                    prompt += f"- 価格帯: {info['price_range']}\n"
+                    parts.append(f"- 価格帯: {info['price_range']}\n")
                 if info.get('rating'):
-                    prompt += f"- 評価: {info['rating']}\n"
-
-        prompt += """
-
-以下のJSON形式で回答してください:
-{
-    "message": "あなたの意見や理由を100文字程度で述べてください。キャラクターの性格と話し方を反映させてください。",
-    "choice": "選択肢の中から1つを選んでください"
-}
-
-キャラクターになりきって、自然で個性的な回答をしてください。"""
+                    parts.append(f"- 評価: {info['rating']}\n")
+            parts.append("\n")
         
-        return prompt
+        return "".join(parts)
     
     async def ask_question(
         self,
@@ -239,13 +729,18 @@ class DebateAgent(BaseAgent):
         try:
             prompt = self._build_question_prompt(topic, options, other_messages)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=128,
-                temperature=0.8
+                stream=True,
+                system_prompt=self._build_system_prompt(topic, options),
+                temperature=0.8,
+                response_schema=_json_schema({
+                    "question": {"type": "string"},
+                    "target_agent": {"type": "string"}
+                })
             )
             
-            parsed = self._parse_json_response(response)
             question = parsed.get('question', '')
             target_agent = parsed.get('target_agent', '')
             
@@ -283,13 +778,18 @@ class DebateAgent(BaseAgent):
         try:
             prompt = self._build_response_prompt(topic, options, question_message, all_messages)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=128,
-                temperature=0.7
+                stream=True,
+                system_prompt=self._build_system_prompt(topic, options),
+                temperature=0.7,
+                response_schema=_json_schema({
+                    "answer": {"type": "string"},
+                    "choice": _choice_schema(options)
+                })
             )
             
-            parsed = self._parse_json_response(response)
             answer = parsed.get('answer', '')
             choice = parsed.get('choice', '')
             
@@ -324,13 +824,18 @@ class DebateAgent(BaseAgent):
         try:
             prompt = self._build_final_opinion_prompt(topic, options, all_messages)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=128,
-                temperature=0.6
+                stream=True,
+                system_prompt=self._build_system_prompt(topic, options),
+                temperature=0.6,
+                response_schema=_json_schema({
+                    "message": {"type": "string"},
+                    "choice": _choice_schema(options)
+                })
             )
             
-            parsed = self._parse_json_response(response)
             message = parsed.get('message', '')
             choice = parsed.get('choice', '')
             
@@ -360,47 +865,21 @@ class DebateAgent(BaseAgent):
         other_messages: List[AgentMessage]
     ) -> str:
         """Build prompt for asking questions"""
-        options_str = "、".join(options)
-        
         # Format other agents' messages with agent_id for targeting
-        other_opinions = ""
-        available_agents = []
-        for msg in other_messages:
-            if msg.agent_id != self.agent_id and msg.message_type == "initial_opinion":
-                other_opinions += f"- {msg.agent_name} (ID: {msg.agent_id}): {msg.message}"
-                if msg.choice:
-                    other_opinions += f" (選択: {msg.choice})"
-                other_opinions += "\n"
-                available_agents.append(f"{msg.agent_id} ({msg.agent_name})")
-        
-        available_agents_str = "、".join(available_agents)
-        
-        prompt = f"""あなたは「{self.persona.name}」として議論に参加しています。
-
-キャラクター設定:
-- 名前: {self.persona.name}
-- 性格: {self.persona.persona}
-- 話し方: {self.persona.speech_style}
-
-議題: {topic}
-選択肢: {options_str}
-
-他の参加者の意見:
-{other_opinions}
-
-他の参加者の意見を聞いて、あなたのキャラクターとして疑問に思った点や詳しく聞きたい点について質問してください。
-
-質問可能な参加者: {available_agents_str}
-
-以下のJSON形式で回答してください:
-{{
-    "question": "質問内容を80文字程度で。キャラクターの話し方で自然に。",
-    "target_agent": "質問したい相手のagent_id (上記のIDから必ず選択)"
-}}
-
-建設的で興味深い質問をしてください。"""
+        relevant = [
+            msg for msg in other_messages
+            if msg.agent_id != self.agent_id and msg.message_type == "initial_opinion"
+        ]
+        other_opinions = "".join(
+            f"- {msg.agent_name} (ID: {msg.agent_id}): {msg.message}"
+            f"{f' (選択: {msg.choice})' if msg.choice else ''}\n"
+            for msg in relevant
+        )
         
-        return prompt
+        return _QUESTION_PROMPT_TEMPLATE.format_map({
+            "other_opinions": other_opinions,
+            "available_agents_str": "、".join(f"{msg.agent_id} ({msg.agent_name})" for msg in relevant)
+        })
     
     def _build_response_prompt(
         self,
@@ -410,32 +889,10 @@ class DebateAgent(BaseAgent):
         all_messages: List[AgentMessage]
     ) -> str:
         """Build prompt for responding to questions"""
-        options_str = "、".join(options)
-        
-        prompt = f"""あなたは「{self.persona.name}」として議論に参加しています。
-
-キャラクター設定:
-- 名前: {self.persona.name}
-- 性格: {self.persona.persona}
-- 話し方: {self.persona.speech_style}
-
-議題: {topic}
-選択肢: {options_str}
-
-{question_message.agent_name}からの質問:
-「{question_message.message}」
-
-この質問にあなたのキャラクターとして答えてください。
-
-以下のJSON形式で回答してください:
-{{
-    "answer": "質問への回答を100文字程度で。キャラクターの話し方で自然に。",
-    "choice": "現時点での選択肢（変更があれば更新）"
-}}
-
-誠実かつキャラクターらしい回答をしてください。"""
-        
-        return prompt
+        return _RESPONSE_PROMPT_TEMPLATE.format_map({
+            "asker_name": question_message.agent_name,
+            "question": question_message.message
+        })
     
     def _build_final_opinion_prompt(
         self,
@@ -444,39 +901,17 @@ class DebateAgent(BaseAgent):
         all_messages: List[AgentMessage]
     ) -> str:
         """Build prompt for final opinion"""
-        options_str = "、".join(options)
-        
-        # Summarize the discussion
-        discussion_summary = ""
-        for msg in all_messages:
-            if msg.agent_id != self.agent_id:
-                discussion_summary += f"- {msg.agent_name} ({msg.message_type}): {msg.message[:50]}...\n"
-        
-        prompt = f"""あなたは「{self.persona.name}」として議論に参加しています。
-
-キャラクター設定:
-- 名前: {self.persona.name}
-- 性格: {self.persona.persona}
-- 話し方: {self.persona.speech_style}
-
-議題: {topic}
-選択肢: {options_str}
-
-これまでの議論:
-{discussion_summary}
-
-全ての議論を聞いた上で、あなたの最終的な意見を述べてください。
-他の人の意見で考えが変わった部分があれば言及してください。
-
-以下のJSON形式で回答してください:
-{{
-    "message": "最終意見を120文字程度で。他の人の意見への反応も含めて。",
-    "choice": "最終的な選択肢"
-}}
-
-熟慮した最終判断を示してください。"""
+        # Summarize only the most recent part of the discussion
+        recent_messages = all_messages[-settings.final_opinion_max_messages:]
+        discussion_summary = "".join(
+            f"- {msg.agent_name} ({msg.message_type}): {msg.message[:50]}...\n"
+            for msg in recent_messages
+            if msg.agent_id != self.agent_id
+        )
         
-        return prompt
+        return _FINAL_OPINION_PROMPT_TEMPLATE.format_map({
+            "discussion_summary": discussion_summary
+        })
 
 class OfficerAgent(BaseAgent):
     """Agent that makes final decisions based on debate results"""
@@ -493,32 +928,42 @@ class OfficerAgent(BaseAgent):
             max_retries=max_retries
         )
     
+    async def prepare(self):
+        """Warm up the officer's provider connection while the debate runs"""
+        await self.provider.warm_up()
+    
     async def generate_decision(
         self, 
         topic: str, 
         options: List[str], 
-        debate_messages: List[AgentMessage]
+        debate_messages: List[AgentMessage],
+        option_set: Optional[FrozenSet[str]] = None
     ) -> Dict[str, Any]:
         """Generate final decision based on debate messages"""
+        option_set = option_set or frozenset(options)
+        
         try:
             prompt = self._build_decision_prompt(topic, options, debate_messages)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=256,
-                temperature=0.3
+                temperature=0.3,
+                response_schema=_json_schema({
+                    # Same canonical order as the options listed in the prompt
+                    "final_choice": _choice_schema(sorted(options)),
+                    "summary": {"type": "string"},
+                    "confidence": {"type": "number"}
+                })
             )
             
-            # Parse the structured response
-            parsed = self._parse_json_response(response)
-            
             final_choice = parsed.get('final_choice', '')
             summary = parsed.get('summary', '')
             confidence = parsed.get('confidence', 0.5)
             
-            if not final_choice or final_choice not in options:
+            if not final_choice or final_choice not in option_set:
                 # Fallback: choose the option mentioned most frequently
-                final_choice = self._fallback_choice(options, debate_messages)
+                final_choice = self._fallback_choice(options, debate_messages, option_set)
             
             logger.info(f"Officer decided: {final_choice} (confidence: {confidence})")
             
@@ -532,7 +977,7 @@ class OfficerAgent(BaseAgent):
             logger.error(f"Error generating decision: {str(e)}")
             # Fallback decision
             return {
-                'final_choice': self._fallback_choice(options, debate_messages),
+                'final_choice': self._fallback_choice(options, debate_messages, option_set),
                 'summary': '技術的な問題により、簡単な集計に基づいて決定しました。',
                 'confidence': 0.3
             }
@@ -544,51 +989,55 @@ class OfficerAgent(BaseAgent):
         debate_messages: List[AgentMessage]
     ) -> str:
         """Build prompt for decision making"""
-        options_str = "、".join(options)
-        
-        # Format debate messages
-        debate_summary = ""
-        for msg in debate_messages:
-            debate_summary += f"- {msg.agent_name}: {msg.message}"
+        # Format the most recent debate messages, clipped to keep the prompt bounded
+        max_chars = settings.officer_max_message_chars
+        parts = []
+        for msg in debate_messages[-settings.officer_max_messages:]:
+            parts.append(f"- {msg.agent_name}: {msg.message[:max_chars]}")
             if msg.choice:
-                debate_summary += f" (選択: {msg.choice})"
-            debate_summary += "\n"
+                parts.append(f" (選択: {msg.choice})")
+            parts.append("\n")
+        debate_summary = "".join(parts)
         
-        prompt = f"""議論の内容を総合的に判断し、最終決定を行ってください。
-
-議題: {topic}
-選択肢: {options_str}
-
-議論の内容:
-{debate_summary}
-
-各参加者の意見を公平に検討し、以下のJSON形式で最終決定を行ってください:
-
-{{
-    "final_choice": "選択肢の中から1つを選択",
-    "summary": "決定理由を150文字程度で説明してください。各参加者の意見をどう考慮したかを含めてください。",
-    "confidence": 0.8
-}}
-
-confidence は 0.0 から 1.0 の間で、この決定への確信度を示してください。
-全体的なバランスを考慮した、公正で合理的な判断をしてください。"""
+        return _DECISION_PROMPT_TEMPLATE.format_map({
+            "topic": topic,
+            # Canonical order keeps the prompt stable for provider-side caching
+            "options_str": "、".join(sorted(options)),
+            "debate_summary": debate_summary
+        })
+    
+    def _parse_json_response(self, response: str) -> Dict[str, Any]:
+        """Parse officer JSON, reading decision fields directly when possible"""
+        match = _DECISION_RE.search(response)
+        if match:
+            final_choice, summary, confidence = match.groups()
+            try:
+                return {
+                    'final_choice': final_choice,
+                    'summary': orjson.loads(f'"{summary}"'),
+                    'confidence': float(confidence)
+                }
+            except orjson.JSONDecodeError:
+                pass
         
-        return prompt
+        return super()._parse_json_response(response)
     
     def _fallback_choice(
         self, 
         options: List[str], 
-        debate_messages: List[AgentMessage]
+        debate_messages: List[AgentMessage],
+        option_set: Optional[FrozenSet[str]] = None
     ) -> str:
         """Fallback choice selection based on frequency"""
-        choice_counts = {option: 0 for option in options}
-        
-        for msg in debate_messages:
-            if msg.choice and msg.choice in choice_counts:
-                choice_counts[msg.choice] += 1
+        option_set = option_set or frozenset(options)
+        choice_counts = Counter(
+            msg.choice for msg in debate_messages if msg.choice in option_set
+        )
         
-        # Return the most frequently chosen option
-        return max(choice_counts, key=choice_counts.get)
+        # Return the most frequently chosen option; ties go to the earlier option
+        if choice_counts:
+            return max(options, key=choice_counts.__getitem__)
+        return options[0]
     
     async def generate_response(
         self, 
@@ -636,13 +1085,15 @@ confidence は 0.0 から 1.0 の間で、この決定への確信度を示し
         try:
             prompt = self._build_officer_question_prompt(topic, options, target_message, all_messages)
             
-            response = await self._generate_with_retry(
+            parsed = await self._generate_json(
                 prompt=prompt,
                 max_tokens=128,
-                temperature=0.5
+                temperature=0.5,
+                response_schema=_json_schema({
+                    "question": {"type": "string"}
+                })
             )
             
-            parsed = self._parse_json_response(response)
             question = parsed.get('question', '')
             
             if not question:
@@ -667,27 +1118,13 @@ confidence は 0.0 から 1.0 の間で、この決定への確信度を示し
         all_messages: List[AgentMessage]
     ) -> str:
         """Build prompt for officer questions"""
-        options_str = "、".join(options)
-        
-        prompt = f"""あなたは議論の議長として、最終決定を下すために必要な情報を収集しています。
-
-議題: {topic}
-選択肢: {options_str}
-
-{target_message.agent_name}の発言:
-「{target_message.message}」
-選択: {target_message.choice}
-
-この発言について、最終決定のためにより詳しく知りたい点や明確にしたい点があれば質問してください。
-
-以下のJSON形式で回答してください:
-{{
-    "question": "議長として聞きたい質問を80文字程度で。丁寧で公正な口調で。"
-}}
-
-建設的で公平な質問をしてください。不要な場合は空文字を返してください。"""
-        
-        return prompt
+        return _OFFICER_QUESTION_PROMPT_TEMPLATE.format_map({
+            "topic": topic,
+            "options_str": self._format_options(options),
+            "agent_name": target_message.agent_name,
+            "message": target_message.message,
+            "choice": target_message.choice
+        })
     
     def _build_prompt(
         self, 
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import time
+import orjson
+from ..config import settings
+
+class ResponseCache:
+    """In-memory LRU cache for AI provider responses and other lookups"""
+    
+    def __init__(self, maxsize: int = 256, ttl_seconds: float = 600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a compact cache key from the request parameters"""
+        payload = orjson.dumps(parts, default=repr, option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached response, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any):
+        """Store a response, evicting the least recently used entries"""
+        if self.maxsize <= 0:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def discard(self, key: str):
+        """Remove a single cached response if present"""
+        self._entries.pop(key, None)
+    
+    def clear(self):
+        """Remove all cached responses"""
+        self._entries.clear()
+
+class SingleFlight:
+    """Coalesce concurrent identical requests into one in-flight call
+    
+    The shared call outlives any single cancelled caller, but is cancelled
+    once every caller waiting on it has given up.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+    
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call for key, or wait on the call already running for it"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        
+        # Shielded so one cancelled caller does not cancel the shared request
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # The last caller gave up, e.g. on a timeout; stop paying for the call
+                    self._forget(key, task)
+                    task.cancel()
+    
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+# Global instances
+inflight_requests = SingleFlight()
+response_cache = ResponseCache(
+    maxsize=settings.response_cache_size,
+    ttl_seconds=settings.response_cache_ttl_seconds
+)
@@ -0,0 +1,65 @@
+from typing import Optional, Tuple
+import re
+
+# Only these characters affect object boundaries; everything else is skipped in C
+_STRUCTURAL_RE = re.compile(r'[{}"\\]')
+
+class JsonObjectScanner:
+    """Incrementally locate the first balanced JSON object in streamed text"""
+    
+    def __init__(self):
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._offset = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped_pos = -1
+    
+    @property
+    def complete(self) -> bool:
+        """Whether a full JSON object has been seen"""
+        return self.end is not None
+    
+    def feed(self, chunk: str) -> bool:
+        """Consume the next chunk of text, returning True once the object is complete"""
+        if self.end is not None:
+            return True
+        
+        offset = self._offset
+        self._offset += len(chunk)
+        
+        for match in _STRUCTURAL_RE.finditer(chunk):
+            pos = offset + match.start()
+            char = match.group()
+            
+            if self._in_string:
+                if pos == self._escaped_pos:
+                    # Character escaped by the preceding backslash
+                    continue
+                if char == '\\':
+                    self._escaped_pos = pos + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '{':
+                if self.start is None:
+                    self.start = pos
+                self._depth += 1
+            elif self.start is None:
+                # Text before the object is ignored
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = pos + 1
+                    return True
+        
+        return False
+
+def find_json_object(text: str) -> Optional[Tuple[int, int]]:
+    """Find the span of the first balanced JSON object in text"""
+    scanner = JsonObjectScanner()
+    if scanner.feed(text):
+        return scanner.start, scanner.end
+    return None
@@ -1,26 +1,131 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-import openai
-import anthropic
+from typing import Dict, Any, Optional, List, AsyncIterator
+from contextlib import nullcontext
+import asyncio
+import httpx
+import orjson
+import threading
 from ..config import settings
+from .rate_limit import AsyncRateLimiter
 import logging
 
 logger = logging.getLogger(__name__)
 
+class ProviderError(Exception):
+    """Normalized failure of an AI provider request"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RetryableProviderError(ProviderError):
+    """Transient provider failure that may succeed on retry"""
+
+class PermanentProviderError(ProviderError):
+    """Provider failure that will not succeed on retry"""
+
+# Transient transport failures; providers add their SDK's connection errors
+_RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    httpx.TransportError,
+)
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header from a provider HTTP error, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def _normalize_error(error: Exception, retryable_errors: tuple = ()) -> ProviderError:
+    """Map an SDK or transport exception onto the ProviderError hierarchy"""
+    if isinstance(error, ProviderError):
+        return error
+    
+    # Timeouts, conflicts, rate limits and server errors reported by status code
+    status_code = getattr(error, 'status_code', None)
+    retryable = (
+        isinstance(error, _RETRYABLE_ERRORS + retryable_errors)
+        or status_code in (408, 409, 429)
+        or (status_code is not None and status_code >= 500)
+    )
+    error_class = RetryableProviderError if retryable else PermanentProviderError
+    return error_class(str(error), retry_after=_retry_after_seconds(error))
+
 class AIProvider(ABC):
     """Abstract base class for AI providers"""
     
+    # Shared by every agent using this provider instance
+    rate_limiter: Optional[AsyncRateLimiter] = None
+    semaphore: Optional[asyncio.Semaphore] = None
+    
+    # SDK exceptions, without a status code, that are still worth retrying
+    retryable_errors: tuple = ()
+    
+    # Shared HTTP client the SDK sends requests through, when one was given
+    http_client: Optional[httpx.AsyncClient] = None
+    
+    def _concurrency_slot(self):
+        """Hold one of the provider's in-flight request slots"""
+        return self.semaphore or nullcontext()
+    
+    async def warm_up(self):
+        """Open a pooled connection to the API so the first request skips the handshake"""
+        client = getattr(self, 'client', None)
+        if self.http_client is None or client is None:
+            return
+        
+        try:
+            # Any response will do; only the TCP/TLS connection is kept
+            await self.http_client.head(str(client.base_url))
+        except Exception as e:
+            logger.debug(f"Provider warm-up failed: {str(e)}")
+    
     @abstractmethod
     async def generate_response(
         self, 
         prompt: str, 
         max_tokens: int = 128,
         temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> str:
-        """Generate a response from the AI model"""
+        """Generate a response from the AI model
+        
+        When response_schema is given, the model is constrained to emit a
+        JSON object matching it and the JSON text is returned. json_mode=True
+        asks for any JSON object where the provider supports it, and
+        system_prompt carries stable instructions the provider may cache.
+        Failures are raised as RetryableProviderError or PermanentProviderError.
+        """
         pass
     
+    async def stream_response(
+        self, 
+        prompt: str, 
+        max_tokens: int = 128,
+        temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream the response text in chunks
+        
+        Providers without native streaming yield the full response once.
+        """
+        yield await self.generate_response(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            response_schema=response_schema,
+            **kwargs
+        )
+    
     @abstractmethod
     def get_model_name(self, agent_type: str) -> str:
         """Get the model name for the given agent type"""
@@ -29,39 +134,115 @@ class AIProvider(ABC):
 class OpenAIProvider(AIProvider):
     """OpenAI API provider"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key not configured")
         
+        # Imported lazily so an unused SDK is never loaded
+        import openai
+        
+        self.retryable_errors = (openai.APIConnectionError,)
+        self.http_client = http_client
         self.client = openai.AsyncOpenAI(
-            api_key=settings.openai_api_key
+            api_key=settings.openai_api_key,
+            http_client=http_client
         )
+        self.rate_limiter = AsyncRateLimiter(
+            requests_per_minute=settings.openai_rpm_limit,
+            tokens_per_minute=settings.openai_tpm_limit
+        )
+        if settings.openai_max_concurrency > 0:
+            self.semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+    
+    def _build_request(
+        self, 
+        prompt: str, 
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build chat completion request parameters"""
+        model = kwargs.get('model', settings.openai_model_debate)
+        
+        # Stable instructions go first so OpenAI's automatic prefix cache hits
+        messages = []
+        system_prompt = kwargs.get('system_prompt')
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        
+        # Structured outputs guarantee parseable JSON
+        if response_schema:
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "agent_response",
+                    "schema": response_schema,
+                    "strict": True
+                }
+            }
+        elif kwargs.get('json_mode'):
+            request["response_format"] = {"type": "json_object"}
+        
+        return request
     
     async def generate_response(
         self, 
         prompt: str, 
         max_tokens: int = 128,
         temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> str:
         """Generate response using OpenAI API"""
         try:
-            model = kwargs.get('model', settings.openai_model_debate)
-            
-            response = await self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
+            request = self._build_request(
+                prompt, max_tokens, temperature, response_schema, **kwargs
             )
             
+            async with self._concurrency_slot():
+                response = await self.client.chat.completions.create(**request)
+            
             return response.choices[0].message.content.strip()
             
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
-            raise
+            raise _normalize_error(e, self.retryable_errors) from e
+    
+    async def stream_response(
+        self, 
+        prompt: str, 
+        max_tokens: int = 128,
+        temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response text using OpenAI API"""
+        try:
+            request = self._build_request(
+                prompt, max_tokens, temperature, response_schema, **kwargs
+            )
+            
+            async with self._concurrency_slot():
+                stream = await self.client.chat.completions.create(stream=True, **request)
+                
+                # Closing the stream early aborts the remaining generation
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise _normalize_error(e, self.retryable_errors) from e
     
     def get_model_name(self, agent_type: str) -> str:
         """Get OpenAI model name for agent type"""
@@ -72,39 +253,118 @@ class OpenAIProvider(AIProvider):
 class AnthropicProvider(AIProvider):
     """Anthropic API provider"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         if not settings.anthropic_api_key:
             raise ValueError("Anthropic API key not configured")
         
+        # Imported lazily so an unused SDK is never loaded
+        import anthropic
+        
+        self.retryable_errors = (anthropic.APIConnectionError,)
+        self.http_client = http_client
         self.client = anthropic.AsyncAnthropic(
-            api_key=settings.anthropic_api_key
+            api_key=settings.anthropic_api_key,
+            http_client=http_client
         )
+        self.rate_limiter = AsyncRateLimiter(
+            requests_per_minute=settings.anthropic_rpm_limit,
+            tokens_per_minute=settings.anthropic_tpm_limit
+        )
+        if settings.anthropic_max_concurrency > 0:
+            self.semaphore = asyncio.Semaphore(settings.anthropic_max_concurrency)
+    
+    def _build_request(
+        self, 
+        prompt: str, 
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build messages request parameters"""
+        model = kwargs.get('model', settings.anthropic_model_debate)
+        
+        request = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        
+        # Mark the stable system prompt as cacheable so repeat calls reuse it
+        system_prompt = kwargs.get('system_prompt')
+        if system_prompt:
+            request["system"] = [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ]
+        
+        # Forced tool use makes the model fill in the schema directly
+        if response_schema:
+            request["tools"] = [{
+                "name": "respond",
+                "description": "Submit the response in the requested JSON format",
+                "input_schema": response_schema
+            }]
+            request["tool_choice"] = {"type": "tool", "name": "respond"}
+        
+        return request
     
     async def generate_response(
         self, 
         prompt: str, 
         max_tokens: int = 128,
         temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> str:
         """Generate response using Anthropic API"""
         try:
-            model = kwargs.get('model', settings.anthropic_model_debate)
-            
-            response = await self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            request = self._build_request(
+                prompt, max_tokens, temperature, response_schema, **kwargs
             )
             
+            async with self._concurrency_slot():
+                response = await self.client.messages.create(**request)
+            
+            if response_schema:
+                for block in response.content:
+                    if block.type == "tool_use":
+                        return orjson.dumps(block.input).decode()
+            
             return response.content[0].text.strip()
             
         except Exception as e:
             logger.error(f"Anthropic API error: {str(e)}")
-            raise
+            raise _normalize_error(e, self.retryable_errors) from e
+    
+    async def stream_response(
+        self, 
+        prompt: str, 
+        max_tokens: int = 128,
+        temperature: float = 0.7,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response text using Anthropic API"""
+        try:
+            request = self._build_request(
+                prompt, max_tokens, temperature, response_schema, **kwargs
+            )
+            
+            # Leaving the context early aborts the remaining generation
+            async with self._concurrency_slot(), self.client.messages.stream(**request) as stream:
+                async for event in stream:
+                    if event.type == "text":
+                        yield event.text
+                    elif event.type == "input_json":
+                        # Tool input arrives as partial JSON when a schema is set
+                        yield event.partial_json
+            
+        except Exception as e:
+            logger.error(f"Anthropic API error: {str(e)}")
+            raise _normalize_error(e, self.retryable_errors) from e
     
     def get_model_name(self, agent_type: str) -> str:
         """Get Anthropic model name for agent type"""
@@ -116,19 +376,47 @@ class AIProviderFactory:
     """Factory for creating AI providers"""
     
     _providers: Dict[str, AIProvider] = {}
+    _default_providers: Dict[str, AIProvider] = {}
+    _http_client: Optional[httpx.AsyncClient] = None
+    _lock = threading.RLock()
+    
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        """Get the keep-alive HTTP/2 connection pool shared by all providers"""
+        if cls._http_client is None:
+            cls._http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+            )
+        return cls._http_client
+    
+    @classmethod
+    async def aclose(cls):
+        """Close the shared HTTP client and drop provider instances using it"""
+        cls._providers.clear()
+        cls._default_providers.clear()
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
     
     @classmethod
     def get_provider(cls, provider_name: str) -> AIProvider:
-        """Get or create AI provider instance"""
-        if provider_name not in cls._providers:
-            if provider_name == "openai":
-                cls._providers[provider_name] = OpenAIProvider()
-            elif provider_name == "anthropic":
-                cls._providers[provider_name] = AnthropicProvider()
-            else:
-                raise ValueError(f"Unknown provider: {provider_name}")
+        """Get or create AI provider instance, constructing each one only once"""
+        provider = cls._providers.get(provider_name)
+        if provider is None:
+            with cls._lock:
+                provider = cls._providers.get(provider_name)
+                if provider is None:
+                    if provider_name == "openai":
+                        provider = OpenAIProvider(cls.get_http_client())
+                    elif provider_name == "anthropic":
+                        provider = AnthropicProvider(cls.get_http_client())
+                    else:
+                        raise ValueError(f"Unknown provider: {provider_name}")
+                    cls._providers[provider_name] = provider
         
-        return cls._providers[provider_name]
+        return provider
     
     @classmethod
     def get_available_providers(cls) -> List[str]:
@@ -144,7 +432,20 @@ class AIProviderFactory:
     
     @classmethod
     def get_default_provider(cls, agent_type: str = "debate") -> AIProvider:
-        """Get default provider based on configuration"""
+        """Get default provider for the agent type, resolved once and shared"""
+        provider = cls._default_providers.get(agent_type)
+        if provider is None:
+            with cls._lock:
+                provider = cls._default_providers.get(agent_type)
+                if provider is None:
+                    provider = cls._select_default_provider(agent_type)
+                    cls._default_providers[agent_type] = provider
+        
+        return provider
+    
+    @classmethod
+    def _select_default_provider(cls, agent_type: str) -> AIProvider:
+        """Select default provider based on configuration"""
         available_providers = cls.get_available_providers()
         
         if not available_providers:
@@ -0,0 +1,50 @@
+from typing import Optional
+import asyncio
+import time
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate; about 4 UTF-8 bytes per token covers both English and Japanese"""
+    return len(text.encode("utf-8")) // 4
+
+class AsyncTokenBucket:
+    """Token bucket that refills continuously at a per-minute rate"""
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+    
+    async def acquire(self, tokens: float = 1):
+        """Wait until the requested number of tokens is available"""
+        # A request larger than the bucket could never be served otherwise
+        tokens = min(tokens, self.capacity)
+        
+        # Waiters queue on the lock, so the bucket is served in FIFO order
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+class AsyncRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider"""
+    
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        # A limit of 0 disables that bucket
+        self._requests = AsyncTokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = AsyncTokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+    
+    async def acquire(self, tokens: int):
+        """Wait for capacity to send one request using the given token count"""
+        if self._requests:
+            await self._requests.acquire(1)
+        if self._tokens:
+            await self._tokens.acquire(tokens)
@@ -1,34 +1,62 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 import logging
 from ..services.avatar_service import avatar_service
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Not immutable: avatar URLs are unversioned, so browsers revalidate via ETag once it expires
+AVATAR_CACHE_CONTROL = "public, max-age=86400"
+
+@lru_cache(maxsize=256)
+def _resolve_avatar(persona_id: str) -> Optional[str]:
+    """Resolve a persona's avatar to an existing file, checked once per process"""
+    avatar_path = avatar_service.get_avatar_path(persona_id)
+    return avatar_path if avatar_path and Path(avatar_path).exists() else None
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _avatar_response(request: Request, avatar_path: str) -> Response:
+    """Serve an avatar from memory, answering 304 when the client copy is current"""
+    # Prefer the smaller WebP encoding when the client accepts it
+    media_type = "image/png"
+    if "image/webp" in request.headers.get("accept", ""):
+        webp_path = avatar_service.get_webp_path(avatar_path)
+        if webp_path:
+            avatar_path, media_type = webp_path, "image/webp"
+    
+    etag = avatar_service.get_avatar_etag(avatar_path)
+    headers = {"Cache-Control": AVATAR_CACHE_CONTROL, "ETag": etag, "Vary": "Accept"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(
+        content=avatar_service.get_avatar_bytes(avatar_path),
+        media_type=media_type,
+        headers=headers
+    )
+
 @router.get("/avatar/{persona_id}")
-async def get_avatar(persona_id: str):
+async def get_avatar(persona_id: str, request: Request):
     """Get avatar image for a specific persona"""
     try:
-        avatar_path = avatar_service.get_avatar_path(persona_id)
-        
-        if not avatar_path or not Path(avatar_path).exists():
-            # Return default avatar or 404
-            default_path = avatar_service.get_avatar_path("ai")
-            if default_path and Path(default_path).exists():
-                return FileResponse(
-                    default_path,
-                    media_type="image/png",
-                    headers={"Cache-Control": "public, max-age=3600"}
-                )
+        avatar_path = _resolve_avatar(persona_id) or _resolve_avatar("ai")
+        if not avatar_path:
             raise HTTPException(status_code=404, detail="Avatar not found")
         
-        return FileResponse(
-            avatar_path,
-            media_type="image/png",
-            headers={"Cache-Control": "public, max-age=3600"}
-        )
+        return _avatar_response(request, avatar_path)
+        
+    except HTTPException:
+        raise
         
     except Exception as e:
         logger.error(f"Error serving avatar for {persona_id}: {str(e)}")
@@ -41,4 +69,14 @@ async def list_avatars():
         return avatar_service.list_available_avatars()
     except Exception as e:
         logger.error(f"Error listing avatars: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error listing avatars")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error listing avatars")
+
+@router.post("/avatars/refresh")
+async def refresh_avatars():
+    """Drop cached avatar paths, bytes and ETags after the icons change on disk"""
+    if not settings.debug:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    _resolve_avatar.cache_clear()
+    avatar_service.clear_cache()
+    return {"status": "ok"}
\ No newline at end of file
@@ -1,40 +1,65 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any
+from typing import Any, Optional, Tuple
 import uuid
 import asyncio
-import json
 import random
-from datetime import datetime
+import orjson
+from datetime import datetime, timezone
 from pathlib import Path
-from ..models.debate import DebateRequest, DebateStartResponse, DebateResult, Persona
-from ..agents.base import DebateAgent, OfficerAgent
+from ..models.debate import DebateRequest, DebateStartResponse, DebateResult, Persona, AgentMessage
+from ..agents.base import DebateAgent, OfficerAgent, run_round
 from ..agents.providers import AIProviderFactory
 from ..services.web_search import web_search_service
+from ..services.debate_store import debate_store
+from ..config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# In-memory storage for debates
-debates: Dict[str, DebateResult] = {}
-
 # Socket.IO instance (will be injected)
 sio = None
 
+PERSONAS_FILE = Path(__file__).resolve().parents[3] / "data" / "personas" / "personas.json"
+
+# Parsed personas, loaded once on first use
+_personas_cache: Optional[Tuple[Persona, ...]] = None
+_personas_lock = asyncio.Lock()
+
+# Caps how many debates run at once; later ones wait for a free slot
+_debate_semaphore = asyncio.Semaphore(max(1, settings.max_concurrent_debates))
+
+# How long the frontend holds each event on screen before showing the next
+ROUND_START_DISPLAY_MS = 1000
+MESSAGE_DISPLAY_MS = 1500
+
 def set_socketio(socketio_instance):
     """Set the Socket.IO instance for real-time events"""
     global sio
     sio = socketio_instance
 
+def _read_personas() -> Tuple[Persona, ...]:
+    """Read the personas file, validating it only when configured to"""
+    personas_data = orjson.loads(PERSONAS_FILE.read_bytes())
+    if settings.validate_personas:
+        return tuple(Persona(**data) for data in personas_data)
+    
+    # The file is trusted repo data, so skip per-field validation
+    return tuple(Persona.model_construct(**data) for data in personas_data)
+
+async def _get_personas() -> Tuple[Persona, ...]:
+    """Get all personas, reading the file off the event loop on first use"""
+    global _personas_cache
+    if _personas_cache is None:
+        async with _personas_lock:
+            if _personas_cache is None:
+                _personas_cache = await asyncio.to_thread(_read_personas)
+    return _personas_cache
+
 async def load_personas(count: int = 3) -> list[Persona]:
     """Load random personas for debate"""
     try:
-        personas_file = Path(__file__).parent.parent.parent.parent / "data" / "personas" / "personas.json"
-        
-        with open(personas_file, 'r', encoding='utf-8') as f:
-            personas_data = json.load(f)
-        
-        personas = [Persona(**data) for data in personas_data]
+        personas = await _get_personas()
         return random.sample(personas, min(count, len(personas)))
         
     except Exception as e:
@@ -64,12 +89,82 @@ async def load_personas(count: int = 3) -> list[Persona]:
             )
         ][:count]
 
+async def _with_timeout(coro):
+    """Bound a single agent call by the configured debate timeout"""
+    return await asyncio.wait_for(coro, timeout=settings.debate_timeout_seconds)
+
+class _RoundEmitter:
+    """on_result callback that streams a round's results in display-tick frames
+    
+    The first result is emitted the moment it arrives. Results that finish
+    while that frame is still on screen are held and sent together as the
+    next frame, so a fast round costs a few frames rather than one per agent.
+    """
+    
+    def __init__(self, debate_id: str, round_number: int):
+        self.debate_id = debate_id
+        self.round_number = round_number
+        self._pending: list[tuple[Any, Any]] = []
+        self._closing = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+    
+    async def __call__(self, agent, result):
+        self._pending.append((agent, result))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_ticks())
+    
+    async def _flush_ticks(self):
+        """Emit held results once per display tick until none arrive"""
+        while self._pending:
+            pending, self._pending = self._pending, []
+            agents = [agent for agent, _ in pending]
+            results = [result for _, result in pending]
+            await process_round_messages(self.debate_id, results, agents, self.round_number)
+            try:
+                await asyncio.wait_for(self._closing.wait(), MESSAGE_DISPLAY_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+        self._flusher = None
+    
+    async def close(self):
+        """Emit whatever is still held; await before the next round starts"""
+        self._closing.set()
+        if self._flusher is not None:
+            await self._flusher
+
+async def _gather_streamed(calls, on_result) -> list:
+    """Await (agent, call) pairs concurrently, handing each result to on_result as it arrives"""
+    async def run(agent, call):
+        try:
+            result = await call
+        except Exception as e:
+            result = e
+        try:
+            await on_result(agent, result)
+        except Exception as e:
+            # A display failure must not cost the round a valid message
+            logger.error(f"Emitting result from {agent.agent_name} failed: {str(e)}")
+        return result
+    
+    return await asyncio.gather(*(run(agent, call) for agent, call in calls))
+
+def _valid_messages(results) -> list[AgentMessage]:
+    """Messages from a round's results, in agent order, without failures"""
+    return [result for result in results if isinstance(result, AgentMessage)]
+
 async def run_debate_process(debate_id: str, topic: str, options: list[str], enable_web_search: bool = False):
     """Run the actual multi-round debate process in background"""
+    async with _debate_semaphore:
+        await _run_debate(debate_id, topic, options, enable_web_search)
+
+async def _run_debate(debate_id: str, topic: str, options: list[str], enable_web_search: bool):
+    """Run all debate rounds and publish the decision"""
     try:
         # Update status
-        if debate_id in debates:
-            debates[debate_id].status = "in_progress"
+        debate_store.update(debate_id, status="in_progress")
+        
+        # Personas do not depend on search results, so load them alongside the search
+        personas_task = asyncio.create_task(load_personas(3))
             
         # Search for store information if enabled
         search_results = None
@@ -82,9 +177,23 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
                 search_results = {}
                 successful_searches = 0
                 
-                for store in detected_stores:
-                    logger.info(f"Searching for store: {store}")
-                    store_info = await web_search_service.search_store_info(store)
+                # Look up every store concurrently, bounded to stay polite to the search backend
+                search_semaphore = asyncio.Semaphore(max(1, settings.web_search_concurrency))
+                
+                async def search_store(store: str):
+                    async with search_semaphore:
+                        logger.info(f"Searching for store: {store}")
+                        return await web_search_service.search_store_info(store)
+                
+                store_infos = await asyncio.gather(
+                    *(search_store(store) for store in detected_stores),
+                    return_exceptions=True
+                )
+                
+                for store, store_info in zip(detected_stores, store_infos):
+                    if isinstance(store_info, Exception):
+                        logger.error(f"Web search failed for {store}: {str(store_info)}")
+                        store_info = None
                     if store_info:
                         search_results[store] = store_info
                         successful_searches += 1
@@ -116,6 +225,9 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
             else:
                 logger.info("No stores detected in options")
         
+        # Shared by every option membership check in this debate
+        option_set = frozenset(options)
+        
         # Initialize rounds
         rounds = [
             {"round_number": 1, "round_type": "initial_opinions", "description": "初期意見表明"},
@@ -126,8 +238,7 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
             {"round_number": 6, "round_type": "decision", "description": "議長による最終決定"}
         ]
         
-        for round_info in rounds:
-            debates[debate_id].rounds.append(round_info)
+        debate_store.update(debate_id, rounds=rounds)
         
         # Emit status update
         if sio:
@@ -137,15 +248,15 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
             }, room=f"debate-{debate_id}")
         
         # Load personas
-        personas = await load_personas(3)
+        personas = await personas_task
         logger.info(f"Loaded personas for debate {debate_id}: {[p.name for p in personas]}")
         
-        # Create agents with search results context
+        # Create agents with search results context; they all share one provider
+        debate_provider = AIProviderFactory.get_default_provider("debate")
         debate_agents = []
         for persona in personas:
             try:
-                provider = AIProviderFactory.get_default_provider("debate")
-                agent = DebateAgent(persona, provider)
+                agent = DebateAgent(persona, debate_provider)
                 
                 # Inject search results into agent context if available
                 if search_results:
@@ -158,6 +269,9 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
         if not debate_agents:
             raise ValueError("No debate agents available")
         
+        # Questions name their target by agent_id
+        agents_by_id = {agent.agent_id: agent for agent in debate_agents}
+        
         # Create officer with search context
         officer_provider = AIProviderFactory.get_default_provider("officer")
         officer = OfficerAgent(officer_provider)
@@ -169,40 +283,44 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
         # === ROUND 1: Initial Opinions ===
         await emit_round_start(debate_id, 1, "初期意見表明")
         
-        initial_tasks = []
-        for agent in debate_agents:
-            task = agent.generate_response(topic, options)
-            initial_tasks.append(task)
-        
-        initial_messages = await asyncio.gather(*initial_tasks, return_exceptions=True)
-        valid_initial = await process_round_messages(debate_id, initial_messages, debate_agents, 1)
+        # Each message is emitted as soon as its agent finishes
+        emitter = _RoundEmitter(debate_id, 1)
+        initial_messages = await DebateAgent.generate_batch(
+            debate_agents, topic, options,
+            timeout=settings.debate_timeout_seconds,
+            on_result=emitter
+        )
+        await emitter.close()
+        valid_initial = _valid_messages(initial_messages)
         
         # === ROUND 2: Peer Questions ===
         await emit_round_start(debate_id, 2, "参加者同士の質疑応答")
         
-        question_tasks = []
-        for agent in debate_agents:
-            task = agent.ask_question(topic, options, valid_initial, 2)
-            question_tasks.append(task)
-        
-        question_messages = await asyncio.gather(*question_tasks, return_exceptions=True)
-        valid_questions = await process_round_messages(debate_id, question_messages, debate_agents, 2)
+        emitter = _RoundEmitter(debate_id, 2)
+        question_messages = await run_round(
+            debate_agents, "ask_question", topic, options, valid_initial, 2,
+            timeout=settings.debate_timeout_seconds,
+            on_result=emitter
+        )
+        await emitter.close()
+        valid_questions = _valid_messages(question_messages)
         
         # === ROUND 3: Question Responses ===
         await emit_round_start(debate_id, 3, "質問への回答")
         
-        all_messages = valid_initial + [q for q in valid_questions if q is not None]
+        # Valid message lists never contain None, so no filtering is needed
+        all_messages = valid_initial + valid_questions
         response_tasks = []
         
         # Process each valid question and ensure responses
         for question in valid_questions:
             if question and question.target_agent:
                 # Find the target agent by agent_id
-                target_agent = next((a for a in debate_agents if a.agent_id == question.target_agent), None)
+                target_agent = agents_by_id.get(question.target_agent)
                 if target_agent:
                     logger.info(f"Creating response task: {question.agent_name} -> {target_agent.agent_name}")
-                    task = target_agent.respond_to_question(topic, options, question, all_messages, 3)
-                    response_tasks.append((task, target_agent.agent_name, question.agent_name))
+                    task = _with_timeout(target_agent.respond_to_question(topic, options, question, all_messages, 3))
+                    response_tasks.append((target_agent, task))
                 else:
                     logger.warning(f"Target agent '{question.target_agent}' not found for question from {question.agent_name}")
             else:
@@ -211,15 +329,10 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
         
         if response_tasks:
             logger.info(f"Processing {len(response_tasks)} response tasks")
-            # Extract just the tasks for gathering
-            tasks_only = [task[0] for task in response_tasks]
-            response_messages = await asyncio.gather(*tasks_only, return_exceptions=True)
-            
-            # Create agent list for process_round_messages (matching response order)
-            responding_agents = [next(a for a in debate_agents if a.agent_name == task[1]) for task in response_tasks]
-            
-            valid_responses = await process_round_messages(debate_id, response_messages, responding_agents, 3)
-            all_messages.extend([r for r in valid_responses if r is not None])
+            emitter = _RoundEmitter(debate_id, 3)
+            response_messages = await _gather_streamed(response_tasks, emitter)
+            await emitter.close()
+            all_messages.extend(_valid_messages(response_messages))
         else:
             logger.warning("No response tasks created - questions may be missing target agents")
         
@@ -233,42 +346,46 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
             # Get responses to officer questions
             officer_response_tasks = []
             for question in officer_questions:
-                if question.target_agent:
-                    target_agent = next((a for a in debate_agents if a.agent_id == question.target_agent), None)
-                    if target_agent:
-                        task = target_agent.respond_to_question(topic, options, question, all_messages, 4)
-                        officer_response_tasks.append(task)
+                target_agent = agents_by_id.get(question.target_agent) if question.target_agent else None
+                if target_agent:
+                    task = _with_timeout(target_agent.respond_to_question(topic, options, question, all_messages, 4))
+                    officer_response_tasks.append((target_agent, task))
+                elif question.target_agent:
+                    logger.warning(f"Target agent '{question.target_agent}' not found for officer question")
             
             if officer_response_tasks:
-                officer_responses = await asyncio.gather(*officer_response_tasks, return_exceptions=True)
-                valid_officer_responses = await process_round_messages(debate_id, officer_responses, debate_agents, 4)
-                all_messages.extend([r for r in valid_officer_responses if r is not None])
+                emitter = _RoundEmitter(debate_id, 4)
+                officer_responses = await _gather_streamed(officer_response_tasks, emitter)
+                await emitter.close()
+                all_messages.extend(_valid_messages(officer_responses))
         
         # === ROUND 5: Final Opinions ===
         await emit_round_start(debate_id, 5, "最終意見表明")
         
-        final_tasks = []
-        for agent in debate_agents:
-            task = agent.final_opinion(topic, options, all_messages, 5)
-            final_tasks.append(task)
-        
-        final_messages = await asyncio.gather(*final_tasks, return_exceptions=True)
-        valid_finals = await process_round_messages(debate_id, final_messages, debate_agents, 5)
-        all_messages.extend([f for f in valid_finals if f is not None])
+        emitter = _RoundEmitter(debate_id, 5)
+        final_messages = await run_round(
+            debate_agents, "final_opinion", topic, options, all_messages, 5,
+            timeout=settings.debate_timeout_seconds,
+            on_result=emitter
+        )
+        await emitter.close()
+        all_messages.extend(_valid_messages(final_messages))
         
         # === ROUND 6: Officer Decision ===
         await emit_round_start(debate_id, 6, "議長による最終決定")
         
-        decision = await officer.generate_decision(topic, options, all_messages)
+        decision = await officer.generate_decision(topic, options, all_messages, option_set)
         
         # Update debate result
-        if debate_id in debates:
-            debates[debate_id].status = "completed"
-            debates[debate_id].completed_at = datetime.utcnow()
-            debates[debate_id].final_choice = decision["final_choice"]
-            debates[debate_id].summary = decision["summary"]
-            debates[debate_id].confidence = decision["confidence"]
-            debates[debate_id].current_round = 6
+        debate_store.update(
+            debate_id,
+            status="completed",
+            completed_at=datetime.now(timezone.utc),
+            final_choice=decision["final_choice"],
+            summary=decision["summary"],
+            confidence=decision["confidence"],
+            current_round=6
+        )
         
         # Emit final decision
         if sio:
@@ -284,8 +401,7 @@ async def run_debate_process(debate_id: str, topic: str, options: list[str], ena
         logger.error(f"Error in debate process {debate_id}: {str(e)}")
         
         # Update status to failed
-        if debate_id in debates:
-            debates[debate_id].status = "failed"
+        debate_store.update(debate_id, status="failed")
         
         # Emit error
         if sio:
@@ -298,19 +414,17 @@ async def emit_round_start(debate_id: str, round_number: int, description: str):
     if sio:
         await sio.emit("round_start", {
             "round_number": round_number,
-            "description": description
+            "description": description,
+            "display_delay_ms": ROUND_START_DISPLAY_MS
         }, room=f"debate-{debate_id}")
     
     # Update current round
-    if debate_id in debates:
-        debates[debate_id].current_round = round_number
-    
-    # Small delay for better UX
-    await asyncio.sleep(1)
+    debate_store.update(debate_id, current_round=round_number)
 
 async def process_round_messages(debate_id: str, messages, agents, round_number: int):
-    """Process and emit messages from a round"""
+    """Process messages from a round and emit them as one batch"""
     valid_messages = []
+    payloads = []
     
     for i, result in enumerate(messages):
         if isinstance(result, Exception):
@@ -320,55 +434,43 @@ async def process_round_messages(debate_id: str, messages, agents, round_number:
             valid_messages.append(result)
             
             # Store message
-            if debate_id in debates:
-                debates[debate_id].messages.append(result)
-            
-            # Emit real-time message
-            if sio:
-                await sio.emit("agent_message", {
-                    "agent_id": result.agent_id,
-                    "agent_name": result.agent_name,
-                    "message": result.message,
-                    "timestamp": result.timestamp.isoformat(),
-                    "choice": result.choice,
-                    "message_type": result.message_type,
-                    "target_agent": result.target_agent,
-                    "round_number": result.round_number
-                }, room=f"debate-{debate_id}")
+            debate_store.append_message(debate_id, result)
             
-            # Small delay for better UX
-            await asyncio.sleep(1.5)
+            payloads.append(result.to_event())
+    
+    # One frame per call; the frontend still reveals the messages one by one
+    if sio and payloads:
+        await sio.emit("round_messages", {
+            "round_number": round_number,
+            "messages": payloads,
+            "display_delay_ms": MESSAGE_DISPLAY_MS
+        }, room=f"debate-{debate_id}")
     
     return valid_messages
 
 @router.post("/debate", response_model=DebateStartResponse)
 async def start_debate(request: DebateRequest, background_tasks: BackgroundTasks):
     """Start a new debate session"""
+    # Validate request before allocating anything for it
+    if len(request.options) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 options required")
+    
+    if not request.topic.strip():
+        raise HTTPException(status_code=400, detail="Topic cannot be empty")
+    
     try:
         debate_id = str(uuid.uuid4())
         
-        # Validate request
-        if len(request.options) < 2:
-            raise HTTPException(status_code=400, detail="At least 2 options required")
-        
-        if len(request.topic.strip()) == 0:
-            raise HTTPException(status_code=400, detail="Topic cannot be empty")
-        
-        # Create initial debate result
-        debate_result = DebateResult(
+        # Registered now so a GET right after this response already finds it
+        stored = debate_store.add(DebateResult(
             id=debate_id,
             topic=request.topic,
             options=request.options,
             status="started",
-            created_at=datetime.utcnow(),
-            messages=[],
-            final_choice=None,
-            summary=None,
-            confidence=None
-        )
-        
-        # Store in memory
-        debates[debate_id] = debate_result
+            created_at=datetime.now(timezone.utc)
+        ))
+        if not stored:
+            raise HTTPException(status_code=503, detail="Too many debates in progress")
         
         # Start debate process in background
         background_tasks.add_task(run_debate_process, debate_id, request.topic, request.options, request.enable_web_search)
@@ -379,6 +481,7 @@ async def start_debate(request: DebateRequest, background_tasks: BackgroundTasks
         
     except HTTPException:
         raise
+        
     except Exception as e:
         logger.error(f"Error starting debate: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to start debate")
@@ -386,7 +489,8 @@ async def start_debate(request: DebateRequest, background_tasks: BackgroundTasks
 @router.get("/debate/{debate_id}", response_model=DebateResult)
 async def get_debate(debate_id: str):
     """Get debate results by ID"""
-    if debate_id not in debates:
+    debate = debate_store.get(debate_id)
+    if debate is None:
         raise HTTPException(status_code=404, detail="Debate not found")
     
-    return debates[debate_id]
\ No newline at end of file
+    return debate
\ No newline at end of file
@@ -16,6 +16,14 @@ class Settings(BaseSettings):
     anthropic_model_debate: str = "claude-3-5-haiku-20241022"
     anthropic_model_officer: str = "claude-sonnet-4-20250514"
     
+    # Provider Rate Limits (0 disables the limit)
+    openai_rpm_limit: int = 0
+    openai_tpm_limit: int = 0
+    anthropic_rpm_limit: int = 0
+    anthropic_tpm_limit: int = 0
+    openai_max_concurrency: int = 20
+    anthropic_max_concurrency: int = 20
+    
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
@@ -26,9 +34,30 @@ class Settings(BaseSettings):
     max_tokens_officer: int = 256
     debate_timeout_seconds: int = 30
     max_concurrent_debates: int = 5
+    officer_max_messages: int = 12
+    officer_max_message_chars: int = 200
+    final_opinion_max_messages: int = 20
+    batch_initial_opinions: bool = False
+    web_search_concurrency: int = 4
+    web_scrape_per_host_concurrency: int = 2
+    web_requests_per_second: int = 10  # 0 disables the limit
+    validate_personas: bool = False  # personas.json ships with the repo; enable in CI to catch schema drift
+    
+    # Debate Storage
+    max_stored_debates: int = 200
+    debate_retention_seconds: int = 3600
+    
+    # Response Cache (0 disables caching)
+    response_cache_size: int = 256
+    response_cache_ttl_seconds: int = 600
+    
+    # Web Search Cache (0 disables caching)
+    web_search_cache_size: int = 512
+    web_search_cache_ttl_seconds: int = 86400
     
     # Logging
     log_level: str = "INFO"
+    socketio_packet_logging: bool = False
     log_format: str = "json"
     
     # Development
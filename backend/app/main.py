@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
+import orjson
 from .config import settings
 from .api import health, debate, avatar
 import logging
@@ -9,12 +10,25 @@ import logging
 logging.basicConfig(level=getattr(logging, settings.log_level.upper()))
 logger = logging.getLogger(__name__)
 
-# Create Socket.IO server
+class OrjsonCodec:
+    """json module stand-in so Socket.IO packets are encoded with orjson"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        # orjson always emits compact separators and handles datetimes natively
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(data, **kwargs):
+        return orjson.loads(data)
+
+# Create Socket.IO server; debate events are broadcast per room, never per client
 sio = socketio.AsyncServer(
     async_mode="asgi",
+    json=OrjsonCodec,
     cors_allowed_origins=settings.cors_origins,
-    logger=True,
-    engineio_logger=True
+    logger=settings.socketio_packet_logging,
+    engineio_logger=settings.socketio_packet_logging
 )
 
 # Create FastAPI app
@@ -54,10 +68,22 @@ async def startup_event():
     # Initialize avatar service
     from .services.avatar_service import avatar_service
     await avatar_service.initialize_avatars()
+    
+    # Build the shared connection pool and default providers before the first debate
+    from .agents.providers import AIProviderFactory
+    try:
+        AIProviderFactory.get_default_provider("debate")
+        AIProviderFactory.get_default_provider("officer")
+    except ValueError as e:
+        logger.warning(f"AI providers not initialized: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("NekoMimi Council API shutting down...")
+    
+    # Close pooled connections to the AI providers
+    from .agents.providers import AIProviderFactory
+    await AIProviderFactory.aclose()
 
 # Socket.IO event handlers
 @sio.event
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import Any, Dict, List, Optional, Literal
+from datetime import datetime, timezone
 import uuid
 
 class DebateRequest(BaseModel):
@@ -15,14 +15,26 @@ class DebateStartResponse(BaseModel):
 
 class AgentMessage(BaseModel):
     """Message from an AI agent during debate"""
+    # Messages never change once created, which also keeps the cached event payload valid
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     agent_id: str = Field(..., description="ID of the agent")
     agent_name: str = Field(..., description="Display name of the agent")
     message: str = Field(..., description="The agent's message")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     choice: Optional[str] = Field(None, description="Agent's preferred choice")
     message_type: Literal["initial_opinion", "question", "response", "final_opinion", "officer_question", "decision"] = Field(..., description="Type of message")
     target_agent: Optional[str] = Field(None, description="Target agent ID for questions/responses")
     round_number: int = Field(..., description="Discussion round number")
+    
+    _event_payload: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    
+    def to_event(self) -> Dict[str, Any]:
+        """Real-time event payload for this message, built once and reused"""
+        if self._event_payload is None:
+            # JSON mode renders the timestamp as an ISO string once, not per encode
+            self._event_payload = self.model_dump(mode="json")
+        return self._event_payload
 
 class DebateRound(BaseModel):
     """Information about a debate round"""
@@ -47,8 +59,11 @@ class DebateResult(BaseModel):
 
 class Persona(BaseModel):
     """AI agent persona definition"""
+    # Loaded personas are cached and shared between debates
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     id: str = Field(..., description="Unique persona ID")
     name: str = Field(..., description="Display name")
     persona: str = Field(..., description="Personality description")
     speech_style: str = Field(..., description="How the persona speaks")
-    weights: dict = Field(default_factory=dict, description="Decision factor weights")
\ No newline at end of file
+    weights: Dict[str, float] = Field(default_factory=dict, description="Decision factor weights")
\ No newline at end of file
@@ -1,9 +1,14 @@
 import os
+import io
+import hashlib
 import logging
 from pathlib import Path
-from typing import Optional, Dict
+from types import MappingProxyType
+from typing import Mapping, Optional, Dict
 from PIL import Image
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
@@ -19,6 +24,11 @@ class AvatarService:
         # Create resized directory if it doesn't exist
         self.resized_dir.mkdir(exist_ok=True)
         
+        # Resized path per icon file, so icons shared by several personas are processed once
+        self._resized_by_filename: Dict[str, str] = {}
+        self._resize_locks: Dict[str, threading.Lock] = {}
+        self._resize_locks_guard = threading.Lock()
+        
         # Persona ID to icon filename mapping
         self.persona_icon_map = {
             "gourmet": "maria.png",        # 美食家マリア
@@ -34,6 +44,11 @@ class AvatarService:
             "officer": "gicho.png",        # 議長
             "system": "ai.png"             # システムメッセージ用
         }
+        
+        # Avatar URLs depend only on the persona IDs above, so build them once
+        self._urls = {
+            persona_id: f"/api/avatar/{persona_id}" for persona_id in self.persona_icon_map
+        }
     
     @lru_cache(maxsize=50)
     def get_avatar_path(self, persona_id: str) -> Optional[str]:
@@ -53,16 +68,63 @@ class AvatarService:
         
         return self._get_resized_avatar(original_path, resized_path)
     
+    @lru_cache(maxsize=50)
+    def get_webp_path(self, avatar_path: str) -> Optional[str]:
+        """Get the WebP version of a resized avatar, if one was written"""
+        webp_path = Path(avatar_path).with_suffix('.webp')
+        return str(webp_path) if webp_path.exists() else None
+    
+    @lru_cache(maxsize=50)
+    def get_avatar_bytes(self, avatar_path: str) -> bytes:
+        """Get an avatar file's contents, read from disk once"""
+        return Path(avatar_path).read_bytes()
+    
+    @lru_cache(maxsize=50)
+    def get_avatar_etag(self, avatar_path: str) -> str:
+        """Get a strong ETag for an avatar file from a hash of its bytes"""
+        digest = hashlib.blake2b(self.get_avatar_bytes(avatar_path), digest_size=16).hexdigest()
+        return f'"{digest}"'
+    
+    def _prepare_avatar(self, persona_id: str) -> Optional[str]:
+        """Resize a persona's avatar and preload its bytes and ETag"""
+        avatar_path = self.get_avatar_path(persona_id)
+        if avatar_path:
+            self.get_avatar_etag(avatar_path)
+            webp_path = self.get_webp_path(avatar_path)
+            if webp_path:
+                self.get_avatar_etag(webp_path)
+        return avatar_path
+    
     def _get_resized_avatar(self, original_path: Path, resized_path: Path) -> Optional[str]:
+        """Return the resized version of an icon file, processing each file once"""
+        filename = original_path.name
+        with self._resize_locks_guard:
+            lock = self._resize_locks.setdefault(filename, threading.Lock())
+        
+        # Personas sharing an icon wait for the first one instead of resizing it again
+        with lock:
+            if filename not in self._resized_by_filename:
+                result = self._resize_avatar(original_path, resized_path)
+                if result is None:
+                    return None
+                self._resized_by_filename[filename] = result
+            return self._resized_by_filename[filename]
+    
+    def _resize_avatar(self, original_path: Path, resized_path: Path) -> Optional[str]:
         """Resize avatar image if needed and return path to resized version"""
         try:
-            # Check if resized version exists and is newer than original
-            if (resized_path.exists() and 
+            webp_path = resized_path.with_suffix('.webp')
+            
+            # Check if resized versions exist and are newer than original
+            if (resized_path.exists() and webp_path.exists() and
                 resized_path.stat().st_mtime >= original_path.stat().st_mtime):
                 return str(resized_path)
             
             # Resize the image
             with Image.open(original_path) as img:
+                # Let JPEG sources decode at a reduced scale; no-op for other formats
+                img.draft('RGB', self.avatar_size)
+                
                 # Convert to RGBA if not already
                 if img.mode != 'RGBA':
                     img = img.convert('RGBA')
@@ -70,8 +132,11 @@ class AvatarService:
                 # Resize with high quality resampling
                 resized_img = img.resize(self.avatar_size, Image.Resampling.LANCZOS)
                 
-                # Save as PNG to preserve transparency
-                resized_img.save(resized_path, 'PNG', optimize=True)
+                # Save as PNG to preserve transparency, palette-quantized when smaller
+                resized_path.write_bytes(self._encode_png(resized_img))
+                
+                # Lossless WebP alongside, for clients that accept it; encoded once, so use the slowest method
+                resized_img.save(webp_path, 'WEBP', lossless=True, quality=100, method=6)
                 
                 logger.info(f"Resized avatar: {original_path} -> {resized_path}")
                 return str(resized_path)
@@ -80,19 +145,40 @@ class AvatarService:
             logger.error(f"Error processing avatar {original_path}: {str(e)}")
             return None
     
+    def _encode_png(self, img: Image.Image) -> bytes:
+        """Encode as optimized PNG, using a 256-colour palette if that is smaller"""
+        full = io.BytesIO()
+        img.save(full, 'PNG', optimize=True)
+        
+        # A 48x48 avatar has at most 2304 pixels, so a palette loses almost nothing
+        quantized = io.BytesIO()
+        img.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(quantized, 'PNG', optimize=True)
+        
+        return min(full.getvalue(), quantized.getvalue(), key=len)
+    
+    def clear_cache(self):
+        """Forget resized paths, bytes and ETags so icons are reloaded from disk"""
+        self._resized_by_filename.clear()
+        self.get_avatar_path.cache_clear()
+        self.get_webp_path.cache_clear()
+        self.get_avatar_bytes.cache_clear()
+        self.get_avatar_etag.cache_clear()
+    
     async def initialize_avatars(self):
         """Pre-process all available avatars"""
         try:
-            tasks = []
-            for persona_id in self.persona_icon_map.keys():
-                # Run avatar processing in thread pool to avoid blocking
-                task = asyncio.get_event_loop().run_in_executor(
-                    None, self.get_avatar_path, persona_id
-                )
-                tasks.append(task)
+            loop = asyncio.get_running_loop()
             
-            # Wait for all avatar processing to complete
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # One worker per core; Pillow releases the GIL while resizing and
+            # encoding, and threads keep results in this process's caches
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+                tasks = [
+                    loop.run_in_executor(pool, self._prepare_avatar, persona_id)
+                    for persona_id in self.persona_icon_map.keys()
+                ]
+                
+                # Wait for all avatar processing to complete
+                results = await asyncio.gather(*tasks, return_exceptions=True)
             
             successful = sum(1 for r in results if isinstance(r, str))
             logger.info(f"Initialized {successful}/{len(tasks)} avatars")
@@ -103,14 +189,11 @@ class AvatarService:
     def get_avatar_url(self, persona_id: str) -> str:
         """Get the URL for a persona's avatar"""
         # This will be the API endpoint URL
-        return f"/api/avatar/{persona_id}"
+        return self._urls.get(persona_id) or f"/api/avatar/{persona_id}"
     
-    def list_available_avatars(self) -> Dict[str, str]:
-        """List all available avatars with their URLs"""
-        return {
-            persona_id: self.get_avatar_url(persona_id)
-            for persona_id in self.persona_icon_map.keys()
-        }
+    def list_available_avatars(self) -> Mapping[str, str]:
+        """List all available avatars with their URLs, as a read-only view"""
+        return MappingProxyType(self._urls)
 
 # Global instance
 avatar_service = AvatarService()
\ No newline at end of file
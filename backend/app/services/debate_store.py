@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import time
+from ..models.debate import DebateResult, AgentMessage
+from ..config import settings
+
+# Statuses after which a debate no longer changes
+FINISHED_STATUSES = ("completed", "failed")
+
+class DebateStore:
+    """In-memory debate results, bounded by count and by retention of finished debates"""
+    
+    def __init__(self, max_entries: int = 200, retention_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.retention_seconds = retention_seconds
+        self._debates: "OrderedDict[str, DebateResult]" = OrderedDict()
+        self._expires_at: Dict[str, float] = {}
+    
+    def add(self, debate: DebateResult) -> bool:
+        """Store a new debate, evicting the least recently used finished ones
+        
+        Debates still running are never evicted; returns False without storing
+        anything when every slot is held by one.
+        """
+        excess = len(self._debates) + 1 - max(1, self.max_entries)
+        if excess > 0:
+            finished = [
+                debate_id for debate_id, stored in self._debates.items()
+                if stored.status in FINISHED_STATUSES
+            ]
+            for debate_id in finished[:excess]:
+                self.discard(debate_id)
+            if len(finished) < excess:
+                return False
+        
+        self._debates[debate.id] = debate
+        self._debates.move_to_end(debate.id)
+        return True
+    
+    def get(self, debate_id: str) -> Optional[DebateResult]:
+        """Return a debate, or None if unknown or past its retention"""
+        debate = self._debates.get(debate_id)
+        if debate is None:
+            return None
+        
+        expires_at = self._expires_at.get(debate_id)
+        if expires_at is not None and expires_at < time.monotonic():
+            self.discard(debate_id)
+            return None
+        
+        self._debates.move_to_end(debate_id)
+        return debate
+    
+    def update(self, debate_id: str, **fields: Any):
+        """Set fields on a stored debate; finished debates start their retention clock"""
+        debate = self.get(debate_id)
+        if debate is None:
+            return
+        
+        for name, value in fields.items():
+            setattr(debate, name, value)
+        
+        if debate.status in FINISHED_STATUSES:
+            self._expires_at[debate_id] = time.monotonic() + self.retention_seconds
+    
+    def append_message(self, debate_id: str, message: AgentMessage):
+        """Record a message on a stored debate"""
+        debate = self.get(debate_id)
+        if debate is not None:
+            debate.messages.append(message)
+    
+    def discard(self, debate_id: str):
+        """Remove a debate if present"""
+        self._debates.pop(debate_id, None)
+        self._expires_at.pop(debate_id, None)
+
+# Global instance
+debate_store = DebateStore(
+    max_entries=settings.max_stored_debates,
+    retention_seconds=settings.debate_retention_seconds
+)
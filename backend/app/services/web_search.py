@@ -1,25 +1,120 @@
 import asyncio
 import logging
+from collections import defaultdict
 from typing import List, Dict, Any, Optional
-from duckduckgo_search import DDGS
+from urllib.parse import parse_qs, urlparse
 import httpx
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import re
+from ..agents.cache import ResponseCache, SingleFlight
+from ..agents.rate_limit import AsyncTokenBucket
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Snippet extraction patterns as (info field, pattern, take first group),
+# listed in priority order within each field. Quantifiers are possessive so a
+# failed match never backtracks through long runs of digits or text; the
+# whitespace before a label's value stays backtrackable because the value may
+# itself be whitespace.
+SNIPPET_PATTERNS = (
+    ("price_range", r'[￥¥]\s*+(\d[,\d]*+)', False),
+    ("price_range", r'(\d[,\d]*+)\s*+円', False),
+    ("price_range", r'予算[：:]\s*([^、。\n]++)', False),
+    ("price_range", r'料金[：:]\s*([^、。\n]++)', False),
+    ("rating", r'評価[：:]\s*+([0-9.]++)', True),
+    ("rating", r'★\s*+([0-9.]++)', True),
+    ("rating", r'([0-9.]++)\s*+点', True),
+    ("rating", r'([0-9.]++)/5', True),
+    ("hours", r'営業時間[：:]\s*([^、。\n]++)', False),
+    ("hours", r'時間[：:]\s*([^、。\n]++)', False),
+    ("hours", r'(\d{1,2}:\d{2})\s*+[-~]\s*+(\d{1,2}:\d{2})', False),
+    ("location", r'住所[：:]\s*([^、。\n]++)', True),
+    ("location", r'所在地[：:]\s*([^、。\n]++)', True),
+    ("location", r'アクセス[：:]\s*([^、。\n]++)', True)
+)
+
+SNIPPET_FIELDS = frozenset(field for field, _, _ in SNIPPET_PATTERNS)
+
+# Index of each field's highest-priority pattern; a match there cannot be beaten
+FIELD_TOP_INDEX = {
+    field: min(index for index, (f, _, _) in enumerate(SNIPPET_PATTERNS) if f == field)
+    for field in SNIPPET_FIELDS
+}
+
+# Every snippet pattern fused into one alternation so a snippet is scanned once.
+# Each alternative is a lookahead, so a long match such as 住所: ... does not
+# swallow a price or rating that follows it on the same line.
+SNIPPET_RE = re.compile("|".join(
+    f"(?=(?P<p{index}>{pattern}))" for index, (_, pattern, _) in enumerate(SNIPPET_PATTERNS)
+))
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Only <title> and the description meta tag are read, which sit in the <head>
+SCRAPE_MAX_BYTES = 8192
+
+# Common Japanese chain stores and restaurant names, matched case-insensitively
+KNOWN_CHAINS = (
+    'マクドナルド', 'マック', 'McDonald', 'スターバックス', 'スタバ', 'Starbucks',
+    'サイゼリヤ', 'サイゼ', 'ガスト', 'すき家', 'なか卯', '松屋', '吉野家',
+    'ケンタッキー', 'KFC', 'モスバーガー', 'モス', 'ファミマ', 'セブン',
+    'ローソン', 'イオン', 'コメダ', 'ドトール', 'タリーズ', 'ココス',
+    'デニーズ', 'ジョナサン', 'バーミヤン', 'ロイヤルホスト', 'びっくりドンキー',
+    '丸亀製麺', 'はなまるうどん', 'リンガーハット', '王将', '餃子の王将',
+    'ラーメン二郎', '一蘭', '一風堂', 'くら寿司', 'スシロー', 'はま寿司',
+    '回転寿司', '焼肉きんぐ', '牛角', 'ステーキガスト', 'いきなりステーキ'
+)
+
+STORE_INDICATORS = (
+    '店', '屋', 'レストラン', 'カフェ', 'cafe', '食堂', '居酒屋',
+    'バー', 'bar', 'ホテル', '旅館', 'リゾート', '温泉'
+)
+
+# Each word list compiled into one alternation (longest first) so an option is
+# scanned once instead of once per word
+KNOWN_CHAINS_RE = re.compile(
+    "|".join(map(re.escape, sorted(KNOWN_CHAINS, key=len, reverse=True))), re.IGNORECASE
+)
+
+# Store indicators, plus a trailing standalone A-E as in "店舗A" or "Shop B"
+STORE_INDICATORS_RE = re.compile(
+    "|".join(map(re.escape, sorted(STORE_INDICATORS, key=len, reverse=True))) + r'|(?<![A-Za-z])[A-E]$'
+)
+
+# Single characters common at the end of Japanese shop names
+PROPER_NOUN_CHARS = frozenset('亭庵館苑園')
+
+# DuckDuckGo's HTML-only endpoint, queried directly with the shared async client
+DDG_LITE_URL = "https://lite.duckduckgo.com/lite/"
+
 class WebSearchService:
     """Service for searching web information about stores and places"""
     
     def __init__(self):
-        self.ddgs = DDGS()
         self.session = None
+        
+        # Store lookups are stable for hours, so repeat searches are served from memory
+        self.cache = ResponseCache(
+            maxsize=settings.web_search_cache_size,
+            ttl_seconds=settings.web_search_cache_ttl_seconds
+        )
+        self.inflight = SingleFlight()
+        
+        # Stay polite to remote sites: a few requests per host, and a global request rate
+        self._host_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(max(1, settings.web_scrape_per_host_concurrency))
+        )
+        rate = settings.web_requests_per_second
+        self._request_bucket = AsyncTokenBucket(rate * 60, capacity=rate) if rate > 0 else None
     
     async def get_session(self):
         """Get or create HTTP session"""
         if self.session is None:
             self.session = httpx.AsyncClient(
                 timeout=10.0,
+                http2=True,
+                limits=httpx.Limits(max_connections=20),
                 headers={
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
@@ -27,7 +122,28 @@ class WebSearchService:
         return self.session
     
     async def search_store_info(self, store_name: str, location: str = "") -> Optional[Dict[str, Any]]:
-        """Search for information about a specific store or place"""
+        """Search for information about a specific store or place, cached by store and location"""
+        key = ResponseCache.make_key(store_name, location)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached search result for: {store_name}")
+            return cached
+        
+        # Concurrent searches for the same store share one lookup
+        result = await self.inflight.run(key, lambda: self._search_store_info(store_name, location))
+        
+        # Failed lookups are not cached so they can be retried
+        if result is not None:
+            self.cache.set(key, result)
+        return result
+    
+    async def _throttle(self):
+        """Wait for the global outbound request rate limit"""
+        if self._request_bucket:
+            await self._request_bucket.acquire(1)
+    
+    async def _search_store_info(self, store_name: str, location: str) -> Optional[Dict[str, Any]]:
+        """Search the web for a store and extract its details"""
         try:
             # Construct search query
             query = f"{store_name}"
@@ -70,17 +186,17 @@ class WebSearchService:
             try:
                 logger.info(f"DuckDuckGo search attempt {attempt + 1}/{max_retries + 1} for: {query}")
                 
-                # Run search in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
+                session = await self.get_session()
+                await self._throttle()
                 
-                # Add timeout to prevent hanging
-                results = await asyncio.wait_for(
-                    loop.run_in_executor(
-                        None,
-                        lambda: list(self.ddgs.text(query, max_results=max_results))
-                    ),
+                # Add timeout to prevent hanging; unlike an executor call this really cancels
+                response = await asyncio.wait_for(
+                    session.post(DDG_LITE_URL, data={'q': query}),
                     timeout=15.0  # 15 second timeout
                 )
+                response.raise_for_status()
+                
+                results = self._parse_ddg_results(response.text, max_results)
                 
                 logger.info(f"Found {len(results)} search results for: {query}")
                 return results
@@ -103,6 +219,33 @@ class WebSearchService:
                     logger.error(f"DuckDuckGo search failed after {max_retries + 1} attempts: {str(e)}")
                     return []
     
+    def _parse_ddg_results(self, html: str, max_results: int) -> List[Dict[str, str]]:
+        """Parse DuckDuckGo lite results into href/title/body dicts"""
+        tree = HTMLParser(html)
+        results = []
+        
+        # Each result link is followed by its snippet cell, in the same order
+        for link, snippet in zip(tree.css('a.result-link'), tree.css('td.result-snippet')):
+            href = link.attributes.get('href') or ''
+            
+            # Links may go through DuckDuckGo's redirect with the target in uddg
+            if 'uddg=' in href:
+                href = parse_qs(urlparse(href).query).get('uddg', [href])[0]
+            
+            # Skip sponsored results
+            if 'duckduckgo.com/y.js' in href:
+                continue
+            
+            results.append({
+                'href': href,
+                'title': link.text().strip(),
+                'body': snippet.text().strip()
+            })
+            if len(results) >= max_results:
+                break
+        
+        return results
+    
     async def _extract_store_details(self, search_results: List[Dict[str, str]]) -> Dict[str, Any]:
         """Extract relevant store information from search results"""
         try:
@@ -119,26 +262,35 @@ class WebSearchService:
             }
             
             session = await self.get_session()
+            scrape_urls = []
             
             for result in search_results:
                 try:
                     url = result.get('href', '')
-                    title = result.get('title', '')
                     snippet = result.get('body', '')
                     
                     # Extract information from snippet
                     self._extract_from_snippet(snippet, info)
                     
-                    # Try to get more details from the webpage
+                    # Restaurant pages are scraped for more details below
                     if url and ('tabelog' in url or 'gurunavi' in url or 'retty' in url or 'google' in url):
-                        page_info = await self._scrape_restaurant_page(session, url)
-                        if page_info:
-                            self._merge_info(info, page_info)
+                        scrape_urls.append(url)
                     
                 except Exception as e:
                     logger.warning(f"Error processing search result: {str(e)}")
                     continue
             
+            # Fetch all pages concurrently, merging in search result order
+            pages = await asyncio.gather(
+                *(self._scrape_restaurant_page(session, url) for url in scrape_urls),
+                return_exceptions=True
+            )
+            for url, page_info in zip(scrape_urls, pages):
+                if isinstance(page_info, Exception):
+                    logger.warning(f"Error scraping {url}: {str(page_info)}")
+                elif page_info:
+                    self._merge_info(info, page_info)
+            
             # Clean up and format information
             self._clean_info(info)
             
@@ -153,59 +305,29 @@ class WebSearchService:
         if not snippet:
             return
         
-        # Extract price information
-        price_patterns = [
-            r'[￥¥]\s*(\d+[,\d]*)',
-            r'(\d+[,\d]*)\s*円',
-            r'予算[：:]\s*([^、。\n]+)',
-            r'料金[：:]\s*([^、。\n]+)'
-        ]
-        
-        for pattern in price_patterns:
-            match = re.search(pattern, snippet)
-            if match and not info["price_range"]:
-                info["price_range"] = match.group(0)
-                break
-        
-        # Extract rating
-        rating_patterns = [
-            r'評価[：:]\s*([0-9.]+)',
-            r'★\s*([0-9.]+)',
-            r'([0-9.]+)\s*点',
-            r'([0-9.]+)/5'
-        ]
-        
-        for pattern in rating_patterns:
-            match = re.search(pattern, snippet)
-            if match and not info["rating"]:
-                info["rating"] = match.group(1)
-                break
-        
-        # Extract hours
-        hour_patterns = [
-            r'営業時間[：:]\s*([^、。\n]+)',
-            r'時間[：:]\s*([^、。\n]+)',
-            r'(\d{1,2}:\d{2})\s*[-~]\s*(\d{1,2}:\d{2})'
-        ]
-        
-        for pattern in hour_patterns:
-            match = re.search(pattern, snippet)
-            if match and not info["hours"]:
-                info["hours"] = match.group(0)
-                break
+        # Fields this snippet can still fill; stop scanning once none are left
+        pending = {field for field in SNIPPET_FIELDS if not info[field]}
         
-        # Extract location
-        location_patterns = [
-            r'住所[：:]\s*([^、。\n]+)',
-            r'所在地[：:]\s*([^、。\n]+)',
-            r'アクセス[：:]\s*([^、。\n]+)'
-        ]
+        # Keep the highest-priority match per field from a single scan
+        best: Dict[str, tuple] = {}
+        for match in SNIPPET_RE.finditer(snippet) if pending else ():
+            index = int(match.lastgroup[1:])
+            field, _, take_group = SNIPPET_PATTERNS[index]
+            if info[field] or (field in best and best[field][0] <= index):
+                continue
+            
+            # lastindex is the named wrapper group; its first inner group follows it
+            group = match.lastindex + 1 if take_group else match.lastindex
+            value = match.group(group)
+            best[field] = (index, value)
+            
+            if index == FIELD_TOP_INDEX[field]:
+                pending.discard(field)
+                if not pending:
+                    break
         
-        for pattern in location_patterns:
-            match = re.search(pattern, snippet)
-            if match and not info["location"]:
-                info["location"] = match.group(1)
-                break
+        for field, (_, value) in best.items():
+            info[field] = value
         
         # Store description if not already set
         if not info["description"] and len(snippet) > 20:
@@ -214,22 +336,34 @@ class WebSearchService:
     async def _scrape_restaurant_page(self, session: httpx.AsyncClient, url: str) -> Optional[Dict[str, Any]]:
         """Scrape additional information from restaurant website"""
         try:
-            response = await session.get(url)
-            if response.status_code != 200:
-                return None
+            # Stream the page and stop once the head has been read
+            chunks = []
+            total = 0
+            async with self._host_semaphores[urlparse(url).netloc]:
+                await self._throttle()
+                async with session.stream('GET', url) as response:
+                    if response.status_code != 200:
+                        return None
+                    
+                    async for chunk in response.aiter_bytes():
+                        chunks.append(chunk)
+                        total += len(chunk)
+                        if total >= SCRAPE_MAX_BYTES:
+                            break
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Bytes let the parser pick up the page's own charset declaration
+            tree = HTMLParser(b''.join(chunks)[:SCRAPE_MAX_BYTES])
             page_info = {}
             
             # Extract title
-            title = soup.find('title')
+            title = tree.css_first('title')
             if title:
-                page_info["title"] = title.get_text().strip()
+                page_info["title"] = title.text().strip()
             
             # Extract meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                page_info["meta_description"] = meta_desc.get('content').strip()
+            meta_desc = tree.css_first('meta[name="description"]')
+            if meta_desc and meta_desc.attributes.get('content'):
+                page_info["meta_description"] = meta_desc.attributes['content'].strip()
             
             return page_info
             
@@ -250,59 +384,37 @@ class WebSearchService:
             if isinstance(value, str):
                 info[key] = value.strip()
                 # Remove excessive whitespace
-                info[key] = re.sub(r'\s+', ' ', info[key])
+                info[key] = WHITESPACE_RE.sub(' ', info[key])
     
     async def detect_store_names(self, options: List[str]) -> List[str]:
         """Detect which options might be store names that need web search"""
-        store_indicators = [
-            '店', '屋', 'レストラン', 'カフェ', 'cafe', '食堂', '居酒屋',
-            'バー', 'bar', 'ホテル', '旅館', 'リゾート', '温泉',
-            'A', 'B', 'C', 'D', 'E'  # Common store suffix patterns
-        ]
-        
-        # Common Japanese chain stores and restaurant names
-        known_chains = [
-            'マクドナルド', 'マック', 'McDonald', 'スターバックス', 'スタバ', 'Starbucks',
-            'サイゼリヤ', 'サイゼ', 'ガスト', 'すき家', 'なか卯', '松屋', '吉野家',
-            'ケンタッキー', 'KFC', 'モスバーガー', 'モス', 'ファミマ', 'セブン',
-            'ローソン', 'イオン', 'コメダ', 'ドトール', 'タリーズ', 'ココス',
-            'デニーズ', 'ジョナサン', 'バーミヤン', 'ロイヤルホスト', 'びっくりドンキー',
-            '丸亀製麺', 'はなまるうどん', 'リンガーハット', '王将', '餃子の王将',
-            'ラーメン二郎', '一蘭', '一風堂', 'くら寿司', 'スシロー', 'はま寿司',
-            '回転寿司', '焼肉きんぐ', '牛角', 'ステーキガスト', 'いきなりステーキ'
-        ]
-        
         detected_stores = []
+        seen = set()
         
         for option in options:
-            option_lower = option.lower()
-            detected = False
+            # Options repeated in the input are only detected once
+            if option in seen:
+                continue
+            seen.add(option)
             
             # Check for known chain stores first
-            for chain in known_chains:
-                if chain.lower() in option_lower or chain in option:
-                    detected_stores.append(option)
-                    detected = True
-                    logger.info(f"Detected known chain: {option} (matched: {chain})")
-                    break
+            chain_match = KNOWN_CHAINS_RE.search(option)
+            if chain_match:
+                detected_stores.append(option)
+                logger.info(f"Detected known chain: {option} (matched: {chain_match.group(0)})")
             
-            if not detected:
-                # Check if option contains store indicators
-                if any(indicator in option for indicator in store_indicators):
-                    detected_stores.append(option)
-                    detected = True
-                    logger.info(f"Detected store by indicator: {option}")
-                
-                # Check if option looks like a proper noun (starts with capital or has specific patterns)
-                elif (len(option) > 2 and 
-                      (option[0].isupper() or 
-                       any(char in option for char in ['亭', '庵', '館', '苑', '園']))):
-                    detected_stores.append(option)
-                    detected = True
-                    logger.info(f"Detected store by pattern: {option}")
+            # Check if option contains store indicators
+            elif STORE_INDICATORS_RE.search(option):
+                detected_stores.append(option)
+                logger.info(f"Detected store by indicator: {option}")
+            
+            # Check if option looks like a proper noun (starts with capital or has specific patterns)
+            elif len(option) > 2 and (option[0].isupper() or not PROPER_NOUN_CHARS.isdisjoint(option)):
+                detected_stores.append(option)
+                logger.info(f"Detected store by pattern: {option}")
         
         logger.info(f"Total detected stores: {len(detected_stores)} from options: {options}")
-        return list(set(detected_stores))  # Remove duplicates
+        return detected_stores
     
     async def close(self):
         """Close HTTP session"""
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import { io, Socket } from 'socket.io-client'
 
 interface AgentMessage {
@@ -12,9 +12,21 @@ interface AgentMessage {
   round_number: number
 }
 
+interface RoundMessages {
+  round_number: number
+  messages: AgentMessage[]
+  display_delay_ms?: number
+}
+
 interface RoundStart {
   round_number: number
   description: string
+  display_delay_ms?: number
+}
+
+interface QueuedEvent {
+  apply: () => void
+  delayMs: number
 }
 
 interface DebateResult {
@@ -33,6 +45,35 @@ export function useDebate() {
   const [rounds, setRounds] = useState<RoundStart[]>([])
   const [currentRound, setCurrentRound] = useState<number>(0)
 
+  // Debate events are shown one at a time, each held for its display delay
+  const eventQueue = useRef<QueuedEvent[]>([])
+  const eventTimer = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  const drainEvents = useCallback(() => {
+    const next = eventQueue.current.shift()
+    if (!next) {
+      eventTimer.current = null
+      return
+    }
+    next.apply()
+    eventTimer.current = setTimeout(drainEvents, next.delayMs)
+  }, [])
+
+  const enqueueEvent = useCallback((apply: () => void, delayMs: number = 0) => {
+    eventQueue.current.push({ apply, delayMs })
+    if (eventTimer.current === null) {
+      drainEvents()
+    }
+  }, [drainEvents])
+
+  const clearEvents = useCallback(() => {
+    eventQueue.current = []
+    if (eventTimer.current !== null) {
+      clearTimeout(eventTimer.current)
+      eventTimer.current = null
+    }
+  }, [])
+
   useEffect(() => {
     const newSocket = io(process.env.NEXT_PUBLIC_WS_URL || 'http://localhost:8001', {
       transports: ['websocket', 'polling']
@@ -55,32 +96,41 @@ export function useDebate() {
       setIsConnected(false)
     })
 
-    newSocket.on('agent_message', (message: AgentMessage) => {
-      console.log('Received agent message:', message)
-      setMessages(prev => [...prev, message])
+    newSocket.on('round_messages', (batch: RoundMessages) => {
+      console.log('Received round messages:', batch)
+      batch.messages.forEach((message) => {
+        enqueueEvent(() => {
+          setMessages(prev => [...prev, message])
+        }, batch.display_delay_ms)
+      })
     })
 
     newSocket.on('round_start', (roundInfo: RoundStart) => {
       console.log('Round started:', roundInfo)
-      setCurrentRound(roundInfo.round_number)
-      
-      // Add round separator message
-      const roundMessage: AgentMessage = {
-        agent_id: 'system',
-        agent_name: '📢 システム',
-        message: `${roundInfo.description}を開始します`,
-        timestamp: new Date().toISOString(),
-        message_type: 'round_start',
-        round_number: roundInfo.round_number
-      }
-      setMessages(prev => [...prev, roundMessage])
+      enqueueEvent(() => {
+        setCurrentRound(roundInfo.round_number)
+        
+        // Add round separator message
+        const roundMessage: AgentMessage = {
+          agent_id: 'system',
+          agent_name: '📢 システム',
+          message: `${roundInfo.description}を開始します`,
+          timestamp: new Date().toISOString(),
+          message_type: 'round_start',
+          round_number: roundInfo.round_number
+        }
+        setMessages(prev => [...prev, roundMessage])
+      }, roundInfo.display_delay_ms)
     })
 
     newSocket.on('decision', (decision: DebateResult) => {
       console.log('Received decision:', decision)
-      setResult(decision)
-      setIsDebating(false)
-      setCurrentRound(6)
+      // Shown after every queued message has been displayed
+      enqueueEvent(() => {
+        setResult(decision)
+        setIsDebating(false)
+        setCurrentRound(6)
+      })
     })
 
     newSocket.on('search_results', (data: any) => {
@@ -114,9 +164,10 @@ export function useDebate() {
     setSocket(newSocket)
 
     return () => {
+      clearEvents()
       newSocket.close()
     }
-  }, [])
+  }, [enqueueEvent, clearEvents])
 
   const startDebate = useCallback(async (topic: string, options: string[], enableWebSearch: boolean = false) => {
     if (!socket || !isConnected) {
@@ -125,6 +176,7 @@ export function useDebate() {
     }
 
     try {
+      clearEvents()
       setIsDebating(true)
       setMessages([])
       setResult(null)
@@ -155,7 +207,7 @@ export function useDebate() {
       setError('議論の開始に失敗しました')
       setIsDebating(false)
     }
-  }, [socket, isConnected])
+  }, [socket, isConnected, clearEvents])
 
   return {
     isConnected,
@@ -0,0 +1,43 @@
+"""
+On-disk cache of CLI initial opinions, keyed by persona, model, topic and options
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+
+from backend.app.models.debate import AgentMessage
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "debate"
+
+# Bump when prompts or the message format change so old entries are not reused
+CACHE_VERSION = 1
+
+# Entries older than this are regenerated
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+def make_key(persona_id: str, model: str, topic: str, options: List[str]) -> str:
+    """Build a cache key; whitespace in the topic and option order do not matter"""
+    payload = orjson.dumps([CACHE_VERSION, persona_id, model, " ".join(topic.split()), sorted(options)])
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def get(key: str) -> Optional[AgentMessage]:
+    """Return the cached message, or None if missing, expired or unreadable"""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > CACHE_TTL_SECONDS:
+            return None
+        return AgentMessage.model_validate(orjson.loads(path.read_bytes()))
+    except Exception:
+        return None
+
+def put(key: str, message: AgentMessage):
+    """Store a message; a read-only checkout simply runs without the cache"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (CACHE_DIR / f"{key}.json").write_bytes(orjson.dumps(message.to_event()))
+    except OSError:
+        pass
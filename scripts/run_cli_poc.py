@@ -6,48 +6,82 @@ Usage: python scripts/run_cli_poc.py --topic "ランチどこ行く?" --options
 
 import asyncio
 import argparse
-import json
+import orjson
 import random
 import sys
 import os
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Add backend to Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.app.models.debate import Persona
-from backend.app.agents.base import DebateAgent, OfficerAgent
-from backend.app.agents.providers import AIProviderFactory
-from backend.app.config import settings
+# Backend modules are imported where they are used, so --help and argument
+# errors return without loading pydantic, httpx and the agent stack
+if TYPE_CHECKING:
+    from backend.app.models.debate import Persona
 
-async def load_personas(count: int = 3) -> list[Persona]:
-    """Load personas from JSON file"""
+# Persona selection uses its own generator so --seed makes runs reproducible
+_RNG = random.Random()
+
+@lru_cache(maxsize=1)
+def _load_all_personas() -> tuple["Persona", ...]:
+    """Load all personas from JSON file, once per process"""
+    from backend.app.models.debate import Persona
+    from backend.app.config import settings
+    
     personas_file = Path(__file__).parent.parent / "data" / "personas" / "personas.json"
     
     if not personas_file.exists():
         raise FileNotFoundError(f"Personas file not found: {personas_file}")
     
-    with open(personas_file, 'r', encoding='utf-8') as f:
-        personas_data = json.load(f)
+    # orjson parses the UTF-8 bytes directly
+    personas_data = orjson.loads(personas_file.read_bytes())
     
-    # Convert to Persona objects
-    personas = [Persona(**data) for data in personas_data]
+    # Convert to Persona objects; the file is trusted, so validation is opt-in
+    if settings.validate_personas:
+        return tuple(Persona(**data) for data in personas_data)
+    return tuple(Persona.model_construct(**data) for data in personas_data)
+
+def write_lines(*lines: str):
+    """Write a block of lines to stdout with a single write and flush"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+async def load_personas(count: int = 3) -> list["Persona"]:
+    """Pick random personas for a debate"""
+    # File reads and parsing run in a worker thread so the event loop stays free
+    personas = await asyncio.to_thread(_load_all_personas)
     
     # Randomly select the specified number of personas
-    selected = random.sample(personas, min(count, len(personas)))
+    selected = _RNG.sample(personas, min(count, len(personas)))
     
     return selected
 
-async def run_debate(topic: str, options: list[str], num_agents: int = 3):
+async def run_debate(
+    topic: str,
+    options: list[str],
+    num_agents: int = 3,
+    use_cache: bool = True,
+    concurrency: int = 8,
+    fastpath: bool = True
+):
     """Run a complete debate simulation"""
+    from backend.app.agents.base import DebateAgent, OfficerAgent, FALLBACK_OPINION_MESSAGE
+    from backend.app.agents.providers import AIProviderFactory
+    from backend.app.config import settings
+    import _debate_cache
     
-    print(f"🐱 NekoMimi Council - CLI PoC")
-    print(f"議題: {topic}")
-    print(f"選択肢: {', '.join(options)}")
-    print(f"エージェント数: {num_agents}")
-    print(f"AIプロバイダー: {settings.ai_provider}")
-    print("-" * 50)
+    write_lines(
+        "🐱 NekoMimi Council - CLI PoC",
+        f"議題: {topic}",
+        f"選択肢: {', '.join(options)}",
+        f"エージェント数: {num_agents}",
+        f"AIプロバイダー: {settings.ai_provider}",
+        "-" * 50
+    )
     
     try:
         # Load personas
@@ -58,14 +92,24 @@ async def run_debate(topic: str, options: list[str], num_agents: int = 3):
         print("🤖 AIエージェントを初期化中...")
         debate_agents = []
         
-        for persona in personas:
+        # All agents share one provider; resolve it once, off the event loop,
+        # since the first call imports the SDK and builds its HTTP client
+        try:
+            provider = await asyncio.to_thread(AIProviderFactory.get_default_provider, "debate")
+        except Exception as e:
+            provider = None
+            print(f"  ✗ AIプロバイダーの初期化に失敗: {str(e)}")
+        
+        status_lines = []
+        for persona in personas if provider else ():
             try:
-                provider = AIProviderFactory.get_default_provider("debate")
                 agent = DebateAgent(persona, provider)
                 debate_agents.append(agent)
-                print(f"  ✓ {persona.name} ({persona.id})")
+                status_lines.append(f"  ✓ {persona.name} ({persona.id})")
             except Exception as e:
-                print(f"  ✗ {persona.name} の初期化に失敗: {str(e)}")
+                status_lines.append(f"  ✗ {persona.name} の初期化に失敗: {str(e)}")
+        if status_lines:
+            write_lines(*status_lines)
         
         if not debate_agents:
             raise ValueError("使用可能なエージェントがありません")
@@ -82,25 +126,48 @@ async def run_debate(topic: str, options: list[str], num_agents: int = 3):
         
         print("\n💭 議論開始...")
         
-        # Run debate in parallel
-        debate_tasks = []
-        for agent in debate_agents:
-            task = agent.generate_response(topic, options)
-            debate_tasks.append(task)
+        # Print each agent's result as soon as it arrives
+        async def print_result(agent, result):
+            if isinstance(result, Exception):
+                write_lines(f"  ✗ {agent.agent_name}: エラー - {str(result)}")
+            elif result.choice:
+                write_lines(f"  💬 {result.agent_name}: {result.message}", f"     → 選択: {result.choice}")
+            else:
+                write_lines(f"  💬 {result.agent_name}: {result.message}")
         
-        # Wait for all agents to respond
-        debate_messages = await asyncio.gather(*debate_tasks, return_exceptions=True)
+        # The officer may use a different API; connect to it while the agents talk
+        officer_prep = asyncio.create_task(officer.prepare())
+        
+        # Opinions from earlier runs with the same persona, model, topic and options are reused
+        cache_keys = {
+            agent.agent_id: _debate_cache.make_key(
+                agent.agent_id, agent.provider.get_model_name("debate"), topic, options
+            )
+            for agent in debate_agents
+        }
+        cached = {}
+        if use_cache:
+            for agent in debate_agents:
+                message = _debate_cache.get(cache_keys[agent.agent_id])
+                if message is not None:
+                    cached[agent.agent_id] = message
+                    await print_result(agent, message)
+        
+        # Run debate in parallel for the rest; results come back in agent order for the officer
+        pending = [agent for agent in debate_agents if agent.agent_id not in cached]
+        # At most `concurrency` agents call the LLM at once, so large --agents runs avoid 429 storms
+        generated = iter(await DebateAgent.generate_batch(
+            pending, topic, options, concurrency=max(1, concurrency), on_result=print_result
+        ) if pending else [])
+        debate_messages = [cached.get(agent.agent_id) or next(generated) for agent in debate_agents]
         
-        # Process results
         valid_messages = []
-        for i, result in enumerate(debate_messages):
-            if isinstance(result, Exception):
-                print(f"  ✗ {debate_agents[i].agent_name}: エラー - {str(result)}")
-            else:
+        for agent, result in zip(debate_agents, debate_messages):
+            if not isinstance(result, Exception):
                 valid_messages.append(result)
-                print(f"  💬 {result.agent_name}: {result.message}")
-                if result.choice:
-                    print(f"     → 選択: {result.choice}")
+                # Only real opinions are stored; a fallback would replay a transient failure
+                if agent.agent_id not in cached and result.message != FALLBACK_OPINION_MESSAGE:
+                    _debate_cache.put(cache_keys[agent.agent_id], result)
         
         if not valid_messages:
             print("❌ 有効な議論メッセージがありませんでした")
@@ -108,13 +175,28 @@ async def run_debate(topic: str, options: list[str], num_agents: int = 3):
         
         print("\n👑 議長による最終決定...")
         
+        # A unanimous debate needs no officer call; a fallback's options[0] is not a real vote
+        choices = {message.choice for message in valid_messages}
+        unanimous = (
+            fastpath
+            and len(choices) == 1
+            and choices <= set(options)
+            and all(message.message != FALLBACK_OPINION_MESSAGE for message in valid_messages)
+        )
+        
         # Officer makes final decision
         try:
-            decision = await officer.generate_decision(topic, options, valid_messages)
-            
-            print("\n" + "=" * 50)
-            print("🎉 最終決定")
-            print("=" * 50)
+            if unanimous:
+                officer_prep.cancel()
+                final_choice = choices.pop()
+                decision = {
+                    "final_choice": final_choice,
+                    "summary": f"全員一致で「{final_choice}」に決定しました。",
+                    "confidence": 1.0
+                }
+            else:
+                await officer_prep
+                decision = await officer.generate_decision(topic, options, valid_messages)
             
             result = {
                 "final_choice": decision["final_choice"],
@@ -122,7 +204,12 @@ async def run_debate(topic: str, options: list[str], num_agents: int = 3):
                 "confidence": decision["confidence"]
             }
             
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            write_lines(
+                "\n" + "=" * 50,
+                "🎉 最終決定",
+                "=" * 50,
+                orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+            )
             
             return result
             
@@ -140,9 +227,16 @@ def main():
     parser.add_argument("--topic", required=True, help="議論のトピック")
     parser.add_argument("--options", required=True, help="選択肢（カンマ区切り）")
     parser.add_argument("--agents", type=int, default=3, help="エージェント数 (デフォルト: 3)")
+    parser.add_argument("--no-cache", action="store_true", help="前回の意見キャッシュを使わない")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に実行するLLM呼び出し数 (デフォルト: 8)")
+    parser.add_argument("--seed", type=int, default=None, help="人格選択の乱数シード")
+    parser.add_argument("--no-fastpath", action="store_true", help="全員一致でも議長の判断を求める")
     
     args = parser.parse_args()
     
+    if args.seed is not None:
+        _RNG.seed(args.seed)
+    
     # Parse options
     options = [opt.strip() for opt in args.options.split(",") if opt.strip()]
     
@@ -151,17 +245,25 @@ def main():
         sys.exit(1)
     
     # Check API keys
+    from backend.app.agents.providers import AIProviderFactory
     available_providers = AIProviderFactory.get_available_providers()
     if not available_providers:
-        print("❌ APIキーが設定されていません")
-        print("OpenAI または Anthropic のAPIキーを .env ファイルに設定してください")
+        write_lines(
+            "❌ APIキーが設定されていません",
+            "OpenAI または Anthropic のAPIキーを .env ファイルに設定してください"
+        )
         sys.exit(1)
     
     print(f"✓ 利用可能なプロバイダー: {', '.join(available_providers)}")
     
     # Run the debate
     try:
-        result = asyncio.run(run_debate(args.topic, options, args.agents))
+        result = asyncio.run(run_debate(
+            args.topic, options, args.agents,
+            use_cache=not args.no_cache,
+            concurrency=args.concurrency,
+            fastpath=not args.no_fastpath
+        ))
         
         if result:
             print("\n✅ 議論が正常に完了しました")